@@ -0,0 +1,35 @@
+# backend/availability.py
+from datetime import date, timedelta
+from typing import Iterable, List, Tuple
+
+# Statusy rezerwacji, które blokują sprzęt w danym okresie
+BLOCKING_STATUSES = ("pending", "active")
+
+
+def compute_windows(busy_ranges: Iterable[Tuple[date, date]], window_start: date, window_end: date) -> Tuple[List[Tuple[date, date]], List[Tuple[date, date]]]:
+    """
+    Złącz zajęte okresy (posortowane po dacie początku) i wyznacz wolne okna
+    w zakresie [window_start, window_end]. Daty są włącznie.
+    """
+    busy: List[Tuple[date, date]] = []
+    for start, end in busy_ranges:
+        start = max(start, window_start)
+        end = min(end, window_end)
+        if start > end:
+            continue
+        if busy and start <= busy[-1][1] + timedelta(days=1):
+            if end > busy[-1][1]:
+                busy[-1] = (busy[-1][0], end)
+        else:
+            busy.append((start, end))
+    
+    free: List[Tuple[date, date]] = []
+    cursor = window_start
+    for start, end in busy:
+        if start > cursor:
+            free.append((cursor, start - timedelta(days=1)))
+        cursor = end + timedelta(days=1)
+    if cursor <= window_end:
+        free.append((cursor, window_end))
+    
+    return busy, free
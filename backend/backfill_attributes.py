@@ -0,0 +1,22 @@
+# backend/backfill_attributes.py
+"""
+Przelicz weight_kg / power_kw / reach_m dla całego sprzętu, np. po zmianie
+parserów w units.py albo po imporcie z pominięciem API.
+
+    python backfill_attributes.py --batch-size 1000
+"""
+import argparse
+
+from main import backfill_equipment_attributes
+
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    processed = backfill_equipment_attributes(batch_size=args.batch_size)
+    print(f"Przeliczono parametry {processed} pozycji sprzętu")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,337 @@
+# backend/benchmarks/bench_api.py
+"""
+Test obciążeniowy API z realistyczną mieszanką scenariuszy.
+
+Serwer startuje na świeżej bazie SQLite (albo na kopii podanej --database),
+dostaje sprzęt i klientów, a potem `--concurrency` wirtualnych użytkowników
+losuje scenariusze według wag z --mix:
+
+    browse  katalog, karta sprzętu, wyszukiwarka, kalendarz dostępności
+    login   logowanie klienta + /api/auth/me
+    book    wycena, rezerwacja, anulowanie przez admina (zwalnia sprzęt)
+    admin   dashboard: statystyki, lista rezerwacji, katalog
+
+Raport: przepustowość i p50/p95/p99 per endpoint (szablon trasy). Wynik
+można zapisać (--output) i porównać z wcześniejszym (--baseline):
+
+    python benchmarks/bench_api.py --concurrency 16 --duration 30 --output wynik.json
+    python benchmarks/bench_api.py --baseline wynik.json --fail-on-regression
+    python benchmarks/bench_api.py --compare stary.json nowy.json
+"""
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from harness import BACKEND_DIR, admin_token, create_equipment, run_server, summarize  # noqa: E402
+
+DEFAULT_MIX = "browse=60,login=10,book=20,admin=10"
+SEARCH_TERMS = ("koparka", "zuraw", "rusztowanie", "diesel", "20 ton", "gps", "maszyny ziemne", "testowa")
+CUSTOMER_PASSWORD = "benchmark123"
+
+# Metryki porównywane z baseline: (klucz, czy wyższa wartość jest lepsza)
+COMPARED_METRICS = (("throughput_rps", True), ("p50_ms", False), ("p95_ms", False), ("p99_ms", False))
+
+
+class Recorder:
+    """Próbki opóźnień i kody odpowiedzi per endpoint (wspólne dla wątków)"""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.errors = defaultdict(int)
+        self.recording = False
+        self._lock = threading.Lock()
+
+    def call(self, session: requests.Session, label: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = session.request(method, url, timeout=60, **kwargs)
+        except requests.RequestException:
+            if self.recording:
+                with self._lock:
+                    self.errors[label] += 1
+            return None
+        elapsed = time.perf_counter() - started
+        if self.recording:
+            with self._lock:
+                self.samples[label].append(elapsed)
+                self.statuses[label][response.status_code] += 1
+        return response
+
+
+class Context:
+    def __init__(self, base_url: str, admin: str, customers, equipment_ids, bookable_ids):
+        self.base_url = base_url
+        self.admin_headers = {"Authorization": f"Bearer {admin}"}
+        self.customers = customers  # [(email, token)]
+        self.equipment_ids = equipment_ids
+        self.bookable_ids = bookable_ids
+
+
+def random_dates(rng: random.Random, max_length: int = 14):
+    start = date.today() + timedelta(days=rng.randint(30, 3000))
+    return start, start + timedelta(days=rng.randint(0, max_length - 1))
+
+
+def scenario_browse(ctx: Context, session, recorder: Recorder, rng: random.Random):
+    url = ctx.base_url
+    recorder.call(session, "GET /api/equipment", "GET", f"{url}/api/equipment", params={"limit": 50})
+    recorder.call(session, "GET /api/equipment/{id}", "GET", f"{url}/api/equipment/{rng.choice(ctx.equipment_ids)}")
+    recorder.call(session, "GET /api/equipment/search", "GET", f"{url}/api/equipment/search", params={"q": rng.choice(SEARCH_TERMS)})
+    start, _ = random_dates(rng)
+    recorder.call(session, "GET /api/equipment/availability", "GET", f"{url}/api/equipment/availability", params={
+        "from": start.isoformat(), "to": (start + timedelta(days=30)).isoformat(),
+    })
+
+
+def scenario_login(ctx: Context, session, recorder: Recorder, rng: random.Random):
+    email, _ = rng.choice(ctx.customers)
+    response = recorder.call(session, "POST /api/auth/login", "POST", f"{ctx.base_url}/api/auth/login", json={
+        "email": email, "password": CUSTOMER_PASSWORD,
+    })
+    if response is not None and response.status_code == 200:
+        token = response.json()["access_token"]
+        recorder.call(session, "GET /api/auth/me", "GET", f"{ctx.base_url}/api/auth/me", headers={"Authorization": f"Bearer {token}"})
+
+
+def scenario_book(ctx: Context, session, recorder: Recorder, rng: random.Random):
+    _, token = rng.choice(ctx.customers)
+    equipment_id = rng.choice(ctx.bookable_ids)
+    start, end = random_dates(rng)
+    line = {"equipment_id": equipment_id, "start_date": start.isoformat(), "end_date": end.isoformat()}
+    recorder.call(session, "POST /api/quotes", "POST", f"{ctx.base_url}/api/quotes", json={"items": [line]})
+    response = recorder.call(session, "POST /api/reservations", "POST", f"{ctx.base_url}/api/reservations", json=line, headers={
+        "Authorization": f"Bearer {token}",
+    })
+    if response is not None and response.status_code == 200:
+        recorder.call(
+            session, "PUT /api/reservations/{id}/status", "PUT",
+            f"{ctx.base_url}/api/reservations/{response.json()['id']}/status",
+            params={"status": "cancelled"}, headers=ctx.admin_headers,
+        )
+
+
+def scenario_admin(ctx: Context, session, recorder: Recorder, rng: random.Random):
+    url = ctx.base_url
+    recorder.call(session, "GET /api/statistics", "GET", f"{url}/api/statistics", headers=ctx.admin_headers)
+    recorder.call(session, "GET /api/reservations", "GET", f"{url}/api/reservations", params={"limit": 100}, headers=ctx.admin_headers)
+    recorder.call(session, "GET /api/equipment", "GET", f"{url}/api/equipment", params={"limit": 100})
+
+
+SCENARIOS = {
+    "browse": scenario_browse,
+    "login": scenario_login,
+    "book": scenario_book,
+    "admin": scenario_admin,
+}
+
+
+def parse_mix(spec: str):
+    weights = {}
+    for part in spec.split(","):
+        name, weight = part.split("=")
+        if name.strip() not in SCENARIOS:
+            raise SystemExit(f"Nieznany scenariusz: {name} (dostępne: {', '.join(SCENARIOS)})")
+        weights[name.strip()] = float(weight)
+    return weights
+
+
+def virtual_user(ctx: Context, recorder: Recorder, mix: dict, seed: int, stop: threading.Event, think_time: float, counts: dict):
+    rng = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    with requests.Session() as session:
+        while not stop.is_set():
+            name = rng.choices(names, weights)[0]
+            SCENARIOS[name](ctx, session, recorder, rng)
+            if recorder.recording:
+                counts[name] += 1
+            if think_time:
+                time.sleep(rng.uniform(0, 2 * think_time))
+
+
+def list_equipment_ids(base_url: str, **filters):
+    ids, cursor = [], None
+    while True:
+        params = {"limit": 1000, "fields": "id", **filters}
+        if cursor:
+            params["cursor"] = cursor
+        response = requests.get(f"{base_url}/api/equipment", params=params, timeout=60)
+        response.raise_for_status()
+        ids += [item["id"] for item in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return ids
+
+
+def prepare(base_url: str, args) -> Context:
+    admin = admin_token(base_url)
+    if args.equipment:
+        create_equipment(base_url, admin, args.equipment)
+    equipment_ids = list_equipment_ids(base_url)
+    # Rezerwujemy tylko sprzęt dostępny - seed ma też maszyny wynajęte/w serwisie
+    bookable_ids = list_equipment_ids(base_url, status="available")
+
+    def register(number: int):
+        email = f"bench{number}@spellbudex.pl"
+        requests.post(f"{base_url}/api/auth/register", json={
+            "name": f"Klient {number}", "email": email, "phone": "+48 500 000 000",
+            "company": "Benchmark", "nip": "0000000000", "address": "ul. Testowa 1",
+            "password": CUSTOMER_PASSWORD,
+        }, timeout=60)
+        response = requests.post(f"{base_url}/api/auth/login", json={"email": email, "password": CUSTOMER_PASSWORD}, timeout=60)
+        response.raise_for_status()
+        return email, response.json()["access_token"]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        customers = list(pool.map(register, range(args.users)))
+    return Context(base_url, admin, customers, equipment_ids, bookable_ids)
+
+
+def git_revision(app_dir: str) -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=app_dir, capture_output=True, text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def run(args) -> dict:
+    mix = parse_mix(args.mix)
+    env = {
+        "RATE_LIMIT_CALLS": "100000000",
+        "LOG_SAMPLE_SUCCESS": "0",
+        "BCRYPT_ROUNDS": str(args.bcrypt_rounds),
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        if args.database:
+            # Kopia, żeby benchmark nie zmieniał pliku źródłowego
+            database = os.path.join(workdir, "bench.db")
+            shutil.copyfile(args.database, database)
+            env["DATABASE_URL"] = f"sqlite:///{database}"
+
+        with run_server(args.app_dir, env=env, workers=args.workers) as base_url:
+            ctx = prepare(base_url, args)
+            recorder = Recorder()
+            counts = defaultdict(int)
+            stop = threading.Event()
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                for number in range(args.concurrency):
+                    pool.submit(virtual_user, ctx, recorder, mix, args.seed + number, stop, args.think_time, counts)
+                time.sleep(args.warmup)
+                recorder.recording = True
+                started = time.perf_counter()
+                time.sleep(args.duration)
+                recorder.recording = False
+                elapsed = time.perf_counter() - started
+                stop.set()
+
+    endpoints = {}
+    for label in sorted(recorder.samples):
+        endpoints[label] = {
+            **summarize(recorder.samples[label], elapsed),
+            "statuses": {str(code): count for code, count in sorted(recorder.statuses[label].items())},
+            "errors": recorder.errors.get(label, 0),
+        }
+    all_samples = [sample for samples in recorder.samples.values() for sample in samples]
+    return {
+        "benchmark": "api",
+        "revision": git_revision(args.app_dir),
+        "python": platform.python_version(),
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "workers": args.workers,
+            "mix": mix,
+            "seed": args.seed,
+            "equipment": len(ctx.equipment_ids),
+            "users": args.users,
+            "bcrypt_rounds": args.bcrypt_rounds,
+        },
+        "scenarios": dict(counts),
+        "total": summarize(all_samples, elapsed),
+        "endpoints": endpoints,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> dict:
+    """Zmiana (%) metryk per endpoint; regresja = pogorszenie ponad próg"""
+    report, regressions = {}, []
+    pairs = [("total", baseline.get("total", {}), current.get("total", {}))]
+    pairs += [(label, baseline["endpoints"].get(label, {}), stats) for label, stats in current.get("endpoints", {}).items()]
+    for label, before, after in pairs:
+        if not before:
+            continue
+        changes = {}
+        for metric, higher_is_better in COMPARED_METRICS:
+            old, new = before.get(metric), after.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * 100
+            changes[metric] = {"baseline": old, "current": new, "change_pct": round(change, 1)}
+            worse = -change if higher_is_better else change
+            if worse > threshold:
+                regressions.append(f"{label}: {metric} {old} -> {new} ({change:+.1f}%)")
+        report[label] = changes
+    return {"threshold_pct": threshold, "endpoints": report, "regressions": regressions}
+
+
+def load_json(path: str) -> dict:
+    with open(path, encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app-dir", default=BACKEND_DIR, help="katalog z main.py")
+    parser.add_argument("--database", help="plik SQLite z danymi (np. z datagen); używana jest kopia")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--workers", type=int, default=1, help="liczba workerów uvicorna")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"wagi scenariuszy, domyślnie {DEFAULT_MIX}")
+    parser.add_argument("--equipment", type=int, default=200, help="dodatkowy sprzęt tworzony przed testem")
+    parser.add_argument("--users", type=int, default=20, help="liczba klientów")
+    parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    parser.add_argument("--think-time", type=float, default=0.0, help="średnia przerwa (s) między scenariuszami")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="zapisz wynik jako JSON")
+    parser.add_argument("--baseline", help="wynik JSON do porównania")
+    parser.add_argument("--threshold", type=float, default=10.0, help="próg regresji w procentach")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="tylko porównaj dwa zapisane wyniki")
+    args = parser.parse_args()
+
+    if args.compare:
+        result = compare(load_json(args.compare[0]), load_json(args.compare[1]), args.threshold)
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+        sys.exit(1 if args.fail_on_regression and result["regressions"] else 0)
+
+    result = run(args)
+    if args.baseline:
+        result["comparison"] = compare(load_json(args.baseline), result, args.threshold)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(result, handle, indent=2, ensure_ascii=False)
+    if args.fail_on_regression and result.get("comparison", {}).get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
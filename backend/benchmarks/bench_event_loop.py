@@ -0,0 +1,81 @@
+# backend/benchmarks/bench_event_loop.py
+"""
+Benchmark blokowania pętli zdarzeń przez dostęp do bazy.
+
+Kilka wątków obciąża endpoint czytający z bazy, a osobna sonda mierzy
+opóźnienie /health (bez bazy). Jeśli handlery blokują pętlę zdarzeń,
+p99 sondy rośnie razem z obciążeniem. Aby porównać przed/po, uruchom
+skrypt z --app-dir wskazującym na katalog backend starszej wersji.
+
+    python benchmarks/bench_event_loop.py --concurrency 16 --duration 10
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import json
+import threading
+import time
+
+import requests
+
+from harness import BACKEND_DIR, admin_token, create_equipment, run_server, summarize
+
+
+def load_worker(base_url: str, stop: threading.Event, samples: list):
+    with requests.Session() as session:
+        while not stop.is_set():
+            started = time.perf_counter()
+            session.get(
+                f"{base_url}/api/equipment/availability",
+                params={"from": "2030-01-01", "to": "2030-12-31"},
+                timeout=60,
+            )
+            samples.append(time.perf_counter() - started)
+
+
+def probe_worker(base_url: str, stop: threading.Event, samples: list, interval: float):
+    with requests.Session() as session:
+        while not stop.is_set():
+            started = time.perf_counter()
+            session.get(f"{base_url}/health", timeout=60)
+            samples.append(time.perf_counter() - started)
+            time.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app-dir", default=BACKEND_DIR, help="katalog z main.py")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--equipment", type=int, default=300, help="liczba maszyn do utworzenia")
+    parser.add_argument("--probe-interval", type=float, default=0.01)
+    parser.add_argument("--output", help="zapisz wynik jako JSON")
+    args = parser.parse_args()
+
+    with run_server(args.app_dir) as base_url:
+        create_equipment(base_url, admin_token(base_url), args.equipment)
+
+        stop = threading.Event()
+        load_samples, probe_samples = [], []
+        with ThreadPoolExecutor(max_workers=args.concurrency + 1) as pool:
+            for _ in range(args.concurrency):
+                pool.submit(load_worker, base_url, stop, load_samples)
+            pool.submit(probe_worker, base_url, stop, probe_samples, args.probe_interval)
+            time.sleep(args.duration)
+            stop.set()
+
+    result = {
+        "benchmark": "event_loop",
+        "app_dir": args.app_dir,
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "health_probe": summarize(probe_samples, args.duration),
+        "db_load": summarize(load_samples, args.duration),
+    }
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(result, handle, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# backend/benchmarks/bench_reservations.py
+"""
+Test obciążeniowy tworzenia rezerwacji: wiele wątków rezerwuje niewielką
+pulę maszyn na nakładające się terminy (pojedynczo i zamówieniami /batch).
+Po każdej udanej rezerwacji admin przywraca status "available", żeby
+o wyniku decydowało sprawdzenie kolizji terminów, a nie sam status.
+
+Na końcu pobieramy wszystkie rezerwacje i sprawdzamy, że żadna maszyna
+nie ma dwóch nakładających się rezerwacji i że numery umów są unikalne.
+Kod wyjścia 1 oznacza podwójną rezerwację.
+
+    python benchmarks/bench_reservations.py --threads 16 --duration 10 --workers 2
+"""
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from harness import admin_token, create_equipment, run_server, summarize  # noqa: E402
+
+BLOCKING_STATUSES = ("pending", "active")
+
+
+def random_window(rng: random.Random, horizon_days: int, max_length: int):
+    start = date(2030, 1, 1) + timedelta(days=rng.randrange(horizon_days))
+    return start, start + timedelta(days=rng.randrange(max_length))
+
+
+def booker(base_url: str, token: str, equipment_ids, args, seed: int, stop: threading.Event, results: dict, lock: threading.Lock):
+    rng = random.Random(seed)
+    headers = {"Authorization": f"Bearer {token}"}
+    latencies, statuses = [], defaultdict(int)
+    with requests.Session() as session:
+        while not stop.is_set():
+            batch = rng.random() < args.batch_ratio
+            chosen = rng.sample(equipment_ids, rng.randint(2, 3) if batch else 1)
+            start, end = random_window(rng, args.horizon_days, args.max_length)
+            items = [{"equipment_id": equipment_id, "start_date": start.isoformat(), "end_date": end.isoformat()} for equipment_id in chosen]
+
+            started = time.perf_counter()
+            if batch:
+                response = session.post(f"{base_url}/api/reservations/batch", json={"items": items}, headers=headers, timeout=30)
+            else:
+                response = session.post(f"{base_url}/api/reservations", json=items[0], headers=headers, timeout=30)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] += 1
+
+            if response.status_code == 200:
+                for equipment_id in chosen:
+                    session.put(f"{base_url}/api/equipment/{equipment_id}", json={"status": "available"}, headers=headers, timeout=30)
+    with lock:
+        results["latencies"].extend(latencies)
+        for status_code, count in statuses.items():
+            results["statuses"][status_code] += count
+
+
+def fetch_reservations(base_url: str, token: str):
+    headers = {"Authorization": f"Bearer {token}"}
+    reservations, cursor = [], None
+    while True:
+        params = {"limit": 1000, "fields": "id,equipment_id,start_date,end_date,status,contract_number"}
+        if cursor:
+            params["cursor"] = cursor
+        response = requests.get(f"{base_url}/api/reservations", params=params, headers=headers, timeout=60)
+        response.raise_for_status()
+        reservations.extend(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return reservations
+
+
+def find_double_bookings(reservations):
+    by_equipment = defaultdict(list)
+    for reservation in reservations:
+        if reservation["status"] in BLOCKING_STATUSES:
+            by_equipment[reservation["equipment_id"]].append((reservation["start_date"], reservation["end_date"], reservation["id"]))
+    overlaps = []
+    for equipment_id, intervals in by_equipment.items():
+        intervals.sort()
+        for (_, previous_end, previous_id), (start, _, current_id) in zip(intervals, intervals[1:]):
+            if start <= previous_end:
+                overlaps.append({"equipment_id": equipment_id, "reservations": [previous_id, current_id]})
+    return overlaps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--workers", type=int, default=1, help="liczba workerów uvicorna")
+    parser.add_argument("--equipment", type=int, default=5, help="mała pula = duża rywalizacja")
+    parser.add_argument("--horizon-days", type=int, default=60)
+    parser.add_argument("--max-length", type=int, default=5)
+    parser.add_argument("--batch-ratio", type=float, default=0.2)
+    parser.add_argument("--output", help="zapisz wynik jako JSON")
+    args = parser.parse_args()
+
+    env = {"RATE_LIMIT_CALLS": "1000000", "LOG_SAMPLE_SUCCESS": "0"}
+    with run_server(env=env, workers=args.workers) as base_url:
+        token = admin_token(base_url)
+        create_equipment(base_url, token, args.equipment)
+        equipment_ids = [item["id"] for item in requests.get(f"{base_url}/api/equipment", params={"limit": 1000}, timeout=30).json()]
+        for equipment_id in equipment_ids:
+            requests.put(f"{base_url}/api/equipment/{equipment_id}", json={"status": "available"}, headers={"Authorization": f"Bearer {token}"}, timeout=30)
+
+        results = {"latencies": [], "statuses": defaultdict(int)}
+        lock = threading.Lock()
+        stop = threading.Event()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            for number in range(args.threads):
+                pool.submit(booker, base_url, token, equipment_ids, args, number, stop, results, lock)
+            time.sleep(args.duration)
+            stop.set()
+        elapsed = time.perf_counter() - started
+
+        reservations = fetch_reservations(base_url, token)
+
+    double_bookings = find_double_bookings(reservations)
+    contract_numbers = [reservation["contract_number"] for reservation in reservations]
+    result = {
+        "benchmark": "reservations",
+        "threads": args.threads,
+        "workers": args.workers,
+        "equipment": len(equipment_ids),
+        "attempts": summarize(results["latencies"], elapsed),
+        "statuses": dict(sorted(results["statuses"].items())),
+        "bookings_per_s": round(results["statuses"].get(200, 0) / elapsed, 2),
+        "reservations": len(reservations),
+        "double_bookings": double_bookings,
+        "duplicate_contract_numbers": len(contract_numbers) - len(set(contract_numbers)),
+    }
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(result, handle, indent=2)
+    if double_bookings or result["duplicate_contract_numbers"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
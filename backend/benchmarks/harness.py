@@ -0,0 +1,125 @@
+# backend/benchmarks/harness.py
+"""Wspólne narzędzia benchmarków: uruchomienie API na tymczasowej bazie i statystyki"""
+from contextlib import contextmanager
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ADMIN_EMAIL = "admin@spellbudex.pl"
+ADMIN_PASSWORD = "admin123"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def run_server(app_dir: str = BACKEND_DIR, env: dict = None, workers: int = 1):
+    """
+    Uruchom `uvicorn main:app` w osobnym procesie na świeżej bazie SQLite
+    w katalogu tymczasowym i zwróć bazowy URL.
+    """
+    port = free_port()
+    with tempfile.TemporaryDirectory() as workdir:
+        server_env = dict(os.environ)
+        server_env.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(workdir, 'spellbudex.db')}")
+        server_env.update(env or {})
+        process = subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", "main:app",
+                "--app-dir", os.path.abspath(app_dir),
+                "--host", "127.0.0.1",
+                "--port", str(port),
+                "--workers", str(workers),
+                "--log-level", "warning",
+            ],
+            cwd=workdir,
+            env=server_env,
+        )
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            wait_until_ready(base_url, process)
+            yield base_url
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def wait_until_ready(base_url: str, process, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Serwer zakończył działanie przed startem")
+        try:
+            if requests.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError("Serwer nie wystartował w wyznaczonym czasie")
+
+
+def admin_token(base_url: str) -> str:
+    requests.post(f"{base_url}/api/seed-data", timeout=30)
+    response = requests.post(
+        f"{base_url}/api/auth/login",
+        json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD},
+        timeout=30,
+    )
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def create_equipment(base_url: str, token: str, count: int):
+    headers = {"Authorization": f"Bearer {token}"}
+    with requests.Session() as session:
+        for number in range(count):
+            session.post(
+                f"{base_url}/api/equipment",
+                json={
+                    "name": f"Koparka testowa {number}",
+                    "category": "Maszyny ziemne",
+                    "daily_rate": 500.0 + number,
+                    "description": "Sprzęt do benchmarku",
+                    "weight": "20 ton",
+                    "fuel_type": "Diesel",
+                    "power": "129 kW",
+                    "reach": "9.5m",
+                    "features": ["GPS"],
+                    "specifications": {"bucketCapacity": "1.2m³"},
+                },
+                headers=headers,
+                timeout=30,
+            ).raise_for_status()
+
+
+def percentile(samples, fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    position = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[position]
+
+
+def summarize(samples, duration: float) -> dict:
+    """Podsumowanie opóźnień (w ms) i przepustowości"""
+    return {
+        "count": len(samples),
+        "throughput_rps": round(len(samples) / duration, 2) if duration else 0.0,
+        "p50_ms": round(percentile(samples, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(samples, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 2),
+        "max_ms": round(max(samples) * 1000, 2) if samples else 0.0,
+    }
@@ -0,0 +1,189 @@
+# backend/bulk_import.py
+"""
+Strumieniowe czytanie importów CSV / NDJSON.
+
+Treść żądania jest czytana kawałkami z pętli zdarzeń (anyio.from_thread),
+dekodowana przyrostowo i zamieniana na rekordy jeden po drugim - w pamięci
+jest tylko bieżąca linia i bieżąca paczka, niezależnie od rozmiaru pliku.
+"""
+from itertools import chain, islice
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional
+import codecs
+import csv
+import json
+import os
+
+import anyio
+
+# Wiersze zapisywane w jednej transakcji
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "500"))
+
+# Ile błędów wierszy zwracamy w raporcie (reszta jest tylko liczona)
+BULK_MAX_REPORTED_ERRORS = int(os.getenv("BULK_MAX_REPORTED_ERRORS", "1000"))
+
+CSV_CONTENT_TYPES = ("text/csv", "application/csv")
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines")
+
+
+class ImportFormatError(Exception):
+    """Nieobsługiwany lub uszkodzony format pliku"""
+
+
+class ParsedRow(NamedTuple):
+    number: int  # numer rekordu danych (od 1, bez nagłówka CSV)
+    data: Optional[Dict[str, Any]]
+    error: Optional[str] = None
+
+
+def detect_format(content_type: Optional[str], explicit: Optional[str] = None) -> str:
+    if explicit:
+        if explicit not in ("csv", "ndjson"):
+            raise ImportFormatError(f"Nieobsługiwany format: {explicit}")
+        return explicit
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in CSV_CONTENT_TYPES:
+        return "csv"
+    if media_type in NDJSON_CONTENT_TYPES:
+        return "ndjson"
+    raise ImportFormatError("Nieobsługiwany format - wyślij text/csv albo application/x-ndjson")
+
+
+def iter_request_body(request) -> Iterator[bytes]:
+    """Synchroniczny iterator po treści żądania - do użycia w wątku puli"""
+    stream = request.stream().__aiter__()
+
+    async def next_chunk():
+        try:
+            return await stream.__anext__()
+        except StopAsyncIteration:
+            return None
+
+    while True:
+        chunk = anyio.from_thread.run(next_chunk)
+        if chunk is None:
+            return
+        if chunk:
+            yield chunk
+
+
+def iter_lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    """Linie tekstu (z końcem linii) z kawałków bajtów UTF-8 (opcjonalny BOM)"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    try:
+        for chunk in chunks:
+            buffer += decoder.decode(chunk)
+            *lines, buffer = buffer.split("\n")
+            for line in lines:
+                yield line + "\n"
+        buffer += decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise ImportFormatError("Plik musi być zakodowany w UTF-8")
+    if buffer:
+        yield buffer
+
+
+def iter_csv_rows(lines: Iterator[str]) -> Iterator[ParsedRow]:
+    """Rekordy CSV jako słowniki; separator ',' albo ';' (eksport z Excela)"""
+    header = next(lines, None)
+    if header is None:
+        return
+    delimiter = ";" if header.count(";") > header.count(",") else ","
+    reader = csv.reader(chain([header], lines), delimiter=delimiter)
+    columns = [column.strip() for column in next(reader)]
+    number = 0
+    try:
+        for values in reader:
+            if not any(value.strip() for value in values):
+                continue
+            number += 1
+            if len(values) != len(columns):
+                yield ParsedRow(number, None, f"Oczekiwano {len(columns)} kolumn, jest {len(values)}")
+                continue
+            yield ParsedRow(number, dict(zip(columns, values)))
+    except csv.Error as error:
+        raise ImportFormatError(f"Błąd CSV po rekordzie {number}: {error}")
+
+
+def iter_ndjson_rows(lines: Iterator[str]) -> Iterator[ParsedRow]:
+    number = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            data = json.loads(line)
+        except ValueError as error:
+            yield ParsedRow(number, None, f"Niepoprawny JSON: {error}")
+            continue
+        if not isinstance(data, dict):
+            yield ParsedRow(number, None, "Wiersz musi być obiektem JSON")
+            continue
+        yield ParsedRow(number, data)
+
+
+def iter_rows(chunks: Iterable[bytes], file_format: str) -> Iterator[ParsedRow]:
+    lines = iter_lines(chunks)
+    if file_format == "csv":
+        return iter_csv_rows(lines)
+    return iter_ndjson_rows(lines)
+
+
+def batched(rows: Iterable[ParsedRow], size: int = BULK_CHUNK_SIZE) -> Iterator[List[ParsedRow]]:
+    iterator = iter(rows)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class ImportReport:
+    """Liczniki importu i ograniczona lista błędów wierszy"""
+
+    def __init__(self, max_errors: int = BULK_MAX_REPORTED_ERRORS):
+        self.max_errors = max_errors
+        self.inserted = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+
+    def fail(self, row: int, message: str):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"row": row, "error": message})
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+def validation_message(error) -> str:
+    """Skrócony opis pydantic.ValidationError: 'pole: komunikat; ...'"""
+    parts: List[str] = []
+    for item in error.errors():
+        location = ".".join(str(part) for part in item.get("loc", ()))
+        parts.append(f"{location}: {item.get('msg')}" if location else item.get("msg", ""))
+    return "; ".join(parts)
+
+
+def parse_list_field(value: Any) -> Any:
+    """CSV: lista jako JSON albo wartości rozdzielone '|'"""
+    if not isinstance(value, str):
+        return value
+    text = value.strip()
+    if text.startswith("["):
+        return json.loads(text)
+    return [item.strip() for item in text.split("|") if item.strip()]
+
+
+def parse_object_field(value: Any) -> Any:
+    """CSV: obiekt jako JSON (pusta komórka = pusty obiekt)"""
+    if not isinstance(value, str):
+        return value
+    return json.loads(value) if value.strip() else {}
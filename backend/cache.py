@@ -0,0 +1,267 @@
+# backend/cache.py
+from collections import OrderedDict
+from hashlib import blake2b
+from typing import Dict, Hashable, NamedTuple, Optional
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+# Jak często (s) worker sprawdza wspólną wersję katalogu w bazie - górna
+# granica, przez jaką inny worker może serwować katalog sprzed zapisu
+CATALOG_VERSION_CHECK_INTERVAL = float(os.getenv("CATALOG_VERSION_CHECK_INTERVAL", "1"))
+
+logger = logging.getLogger(__name__)
+
+
+class CachedResponse(NamedTuple):
+    etag: str
+    body: bytes
+    next_cursor: Optional[str] = None
+
+
+class SharedVersion:
+    """
+    Licznik wersji w wierszu bazy (kolumny: name, value), wspólny dla workerów.
+
+    Podbicie to osobna, krótka transakcja po commicie zapisu. Odczyt jest
+    ograniczony do jednego zapytania na `check_interval` sekund na proces.
+    """
+
+    def __init__(self, session_factory, model, name: str, check_interval: float = CATALOG_VERSION_CHECK_INTERVAL):
+        self.session_factory = session_factory
+        self.model = model
+        self.name = name
+        self.check_interval = check_interval
+        self._value: Optional[int] = None
+        self._checked_at = 0.0
+
+    def current(self, force: bool = False) -> Optional[int]:
+        """Wersja z bazy; bez `force` co najwyżej raz na `check_interval`"""
+        if not force and self._value is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return self._value
+        model = self.model
+        db = self.session_factory()
+        try:
+            self._value = db.query(model.value).filter(model.name == self.name).scalar() or 0
+        except SQLAlchemyError as error:
+            # Baza chwilowo zajęta - zostań przy ostatniej znanej wersji
+            logger.warning("Odczyt wersji %s nieudany: %s", self.name, error)
+        finally:
+            db.close()
+        self._checked_at = time.monotonic()
+        return self._value
+
+    def bump(self) -> Optional[int]:
+        model = self.model
+        for _ in range(3):
+            db = self.session_factory()
+            try:
+                updated = db.query(model).filter(model.name == self.name).update(
+                    {model.value: model.value + 1}, synchronize_session=False
+                )
+                if not updated:
+                    db.add(model(name=self.name, value=1))
+                db.commit()
+                self._value = db.query(model.value).filter(model.name == self.name).scalar()
+                self._checked_at = time.monotonic()
+                return self._value
+            except IntegrityError:
+                # Inny worker utworzył wiersz równolegle - ponów UPDATE
+                db.rollback()
+            except SQLAlchemyError as error:
+                # Zapis danych już się udał - nie psujemy odpowiedzi, inne
+                # workery zobaczą zmianę przy następnym udanym podbiciu
+                db.rollback()
+                logger.warning("Podbicie wersji %s nieudane: %s", self.name, error)
+                return None
+            finally:
+                db.close()
+        return None
+
+
+class CatalogCache:
+    """
+    Cache gotowych odpowiedzi katalogu sprzętu.
+
+    Wpisy są kluczowane parametrami zapytania i licznikiem wersji. Każdy zapis
+    do sprzętu lub rezerwacji podbija wersję i czyści cache. Z `shared`
+    (SharedVersion) wersja jest wspólna dla workerów - zapis na jednym
+    workerze czyści cache pozostałych najpóźniej po `check_interval`.
+    """
+
+    def __init__(self, max_entries: int = 256, shared: Optional[SharedVersion] = None):
+        self.max_entries = max_entries
+        self.shared = shared
+        self._version = 0
+        self._entries: Dict[Hashable, CachedResponse] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def bump(self):
+        """Unieważnij wszystkie wpisy (wywoływane po zmianie danych)"""
+        shared_version = self.shared.bump() if self.shared else None
+        with self._lock:
+            if shared_version is not None and shared_version > self._version:
+                self._version = shared_version
+            else:
+                self._version += 1
+            self._entries.clear()
+
+    def sync(self):
+        """Przejmij wersję zapisaną przez inne workery"""
+        if self.shared is None:
+            return
+        shared_version = self.shared.current()
+        if shared_version is None or shared_version == self._version:
+            return
+        with self._lock:
+            if shared_version != self._version:
+                self._version = shared_version
+                self._entries.clear()
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        self.sync()
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def store(self, key: Hashable, version: int, body: bytes, next_cursor: Optional[str] = None) -> CachedResponse:
+        """
+        Zapisz odpowiedź zbudowaną dla danej wersji. Jeśli w międzyczasie
+        wersja się zmieniła, odpowiedź jest zwracana, ale nie trafia do cache.
+        """
+        etag = f'"{version}-{blake2b(body, digest_size=8).hexdigest()}"'
+        entry = CachedResponse(etag, body, next_cursor)
+        with self._lock:
+            if version == self._version:
+                if len(self._entries) >= self.max_entries:
+                    self._entries.clear()
+                self._entries[key] = entry
+        return entry
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Porównanie nagłówka If-None-Match z ETagiem (RFC 7232)"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class RowCache:
+    """
+    Cache wyników przetwarzania pojedynczych wierszy (np. sparsowanego JSON-a
+    i wyrenderowanej odpowiedzi). Wpis jest ważny tak długo, jak długo nie
+    zmieni się wersja wiersza (krotka wartości jego kolumn).
+    """
+
+    def __init__(self, max_entries: int = 100_000):
+        self.max_entries = max_entries
+        self._entries: Dict[Hashable, tuple] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, version: Hashable):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return None
+
+    def store(self, key: Hashable, version: Hashable, value):
+        if len(self._entries) >= self.max_entries:
+            self._entries.clear()
+        self._entries[key] = (version, value)
+        return value
+
+    def clear(self):
+        self._entries.clear()
+
+
+class PrincipalCache:
+    """
+    Cache zalogowanych użytkowników (LRU + TTL) kluczowany tokenem.
+
+    Unieważnienie działa per podmiot (email): podbicie generacji sprawia,
+    że wszystkie zapisane wcześniej wpisy tego użytkownika są pomijane.
+    Z `shared` (SharedVersion) unieważnienie podbija też wersję wspólną
+    dla workerów - pozostałe czyszczą cały cache, gdy ją zobaczą.
+    """
+
+    def __init__(self, max_entries: int = 10_000, ttl: float = 60.0, shared: Optional[SharedVersion] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.shared = shared
+        self._shared_version: Optional[int] = None
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def sync(self, force: bool = False):
+        """Wyczyść cache, jeśli inny worker unieważnił któregoś użytkownika"""
+        if self.shared is None:
+            return
+        shared_version = self.shared.current(force)
+        if shared_version is None or shared_version == self._shared_version:
+            return
+        with self._lock:
+            if shared_version != self._shared_version:
+                self._shared_version = shared_version
+                self._entries.clear()
+
+    def get(self, token: str):
+        self.sync()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None:
+                subject, generation, expires_at, value = entry
+                if expires_at > now and self._generations.get(subject, 0) == generation:
+                    self._entries.move_to_end(token)
+                    self.hits += 1
+                    return value
+                del self._entries[token]
+            self.misses += 1
+            return None
+
+    def store(self, token: str, subject: str, value, expires_in: Optional[float] = None):
+        """Zapisz snapshot; wpis wygasa po TTL albo wcześniej, razem z tokenem"""
+        ttl = self.ttl if expires_in is None else min(self.ttl, expires_in)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[token] = (subject, self._generations.get(subject, 0), time.monotonic() + ttl, value)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, subject: str):
+        with self._lock:
+            self._generations[subject] = self._generations.get(subject, 0) + 1
+        shared_version = self.shared.bump() if self.shared else None
+        with self._lock:
+            # Własne wpisy podmiotu są już pominięte - nie czyść całego cache,
+            # chyba że w międzyczasie wersję podbił też inny worker
+            if shared_version is not None and shared_version == (self._shared_version or 0) + 1:
+                self._shared_version = shared_version
@@ -0,0 +1,95 @@
+# backend/database.py
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.engine import Engine, make_url
+from typing import List
+import os
+
+# Adres bazy - domyślnie lokalny plik SQLite
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./spellbudex.db")
+
+# Profil SQLite
+SQLITE_TUNING = os.getenv("SQLITE_TUNING", "1") == "1"
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # ujemne = KiB, tu 64 MiB
+
+# Pula połączeń (Postgres i plik SQLite)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "30"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+# Ile połączeń pula wyda naraz - pula wątków handlerów nie może być większa
+DB_POOL_CAPACITY = DB_POOL_SIZE + DB_MAX_OVERFLOW
+
+
+def is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def build_engine(url: str = DATABASE_URL, tune: bool = SQLITE_TUNING) -> Engine:
+    """Utwórz silnik bazy z ustawieniami dobranymi do backendu"""
+    if is_sqlite(url):
+        return _build_sqlite_engine(url, tune)
+    return create_engine(
+        url,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=True,
+    )
+
+
+def _build_sqlite_engine(url: str, tune: bool) -> Engine:
+    in_memory = make_url(url).database in (None, "", ":memory:")
+    # Baza w pamięci ma jedną pulę per wątek - rozmiar dotyczy tylko pliku
+    pool_options = {} if in_memory else {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+    }
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
+        **pool_options,
+    )
+    if not tune:
+        return engine
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not in_memory:
+            # WAL: czytający nie blokują piszących i odwrotnie
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+    return engine
+
+
+def add_missing_columns(engine: Engine, metadata) -> List[str]:
+    """
+    create_all nie zmienia istniejących tabel - dopisz kolumny dodane później
+    w modelach (ALTER TABLE ... ADD COLUMN). Tylko kolumny dopuszczające NULL.
+    Zwraca listę dodanych kolumn jako "tabela.kolumna".
+    """
+    inspector = inspect(engine)
+    added = []
+    with engine.begin() as connection:
+        for table in metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                connection.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}")
+                added.append(f"{table.name}.{column.name}")
+    return added
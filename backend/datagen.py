@@ -0,0 +1,390 @@
+# backend/datagen.py
+"""
+Generator danych syntetycznych w skali produkcyjnej (zamiast trzech maszyn
+z /api/seed-data) - do benchmarków i odtwarzania problemów wydajnościowych.
+
+    DATABASE_URL=sqlite:///./bench.db python datagen.py \\
+        --users 20000 --equipment 5000 --reservations 1000000 --seed 42
+
+Dane są wstawiane paczkami przez SQLAlchemy Core (executemany), bez ORM.
+Ten sam --seed i --today dają te same dane (poza solą hashy haseł).
+Rezerwacje jednej maszyny nigdy na siebie nie nachodzą: horyzont czasu
+maszyny jest dzielony losowymi cięciami na rozłączne odcinki i każda
+rezerwacja leży w swoim odcinku.
+
+Konto administratora jak w seed-data (admin@spellbudex.pl / admin123),
+klienci: klient<id>@example.pl z hasłem --password.
+
+Uruchamiaj na zatrzymanym serwerze - cache katalogu i renderowania
+workerów są w pamięci procesów i nie zobaczą nowych danych do restartu.
+"""
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Iterator, List
+import argparse
+import json
+import random
+import time
+
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.orm import Session
+
+from main import (
+    Equipment, NumberSequence, Reservation, SessionLocal, User, contract_numbers, engine,
+    equipment_numeric_attributes, hash_password, pricing_engine, rebuild_search_index, rebuild_statistics,
+)
+from pricing import CompiledRules
+
+ADMIN_EMAIL = "admin@spellbudex.pl"
+ADMIN_PASSWORD = "admin123"
+
+# kategoria -> (typy, marki, (min, max) masa kg, (min, max) moc kW, (min, max) zasięg m, (min, max) stawka, paliwa, cechy)
+CATALOG = {
+    "Maszyny ziemne": (
+        ("Koparka gąsienicowa", "Koparka kołowa", "Minikoparka", "Ładowarka kołowa", "Spycharka"),
+        ("CAT", "Komatsu", "Volvo", "JCB", "Hitachi", "Doosan"),
+        (1500, 40000), (15, 250), (3, 12), (250, 1500), ("Diesel",),
+        ("GPS", "Klimatyzacja", "Kamera cofania", "Młot hydrauliczny", "Szybkozłącze", "Łyżka skarpowa"),
+    ),
+    "Żurawie": (
+        ("Żuraw wieżowy", "Żuraw samojezdny", "Żuraw szybkomontujący"),
+        ("Liebherr", "Potain", "Terex", "Grove", "Tadano"),
+        (8000, 60000), (20, 300), (20, 80), (800, 3500), ("Elektryczny", "Diesel"),
+        ("Automatyka", "Winda osobowa", "LED oświetlenie", "System antykolizyjny", "Pilot radiowy"),
+    ),
+    "Rusztowania": (
+        ("Rusztowanie ramowe", "Rusztowanie warszawskie", "Rusztowanie modułowe", "Rusztowanie jezdne"),
+        ("Layher", "Plettac", "Altrad", "Baumann"),
+        None, None, (5, 40), (30, 200), ("Brak",),
+        ("Ocynkowane", "Podesty robocze", "Balustrady", "Drabinki dostępowe", "Siatka ochronna"),
+    ),
+    "Zagęszczarki": (
+        ("Zagęszczarka płytowa", "Stopa wibracyjna", "Walec wibracyjny"),
+        ("Wacker Neuson", "Bomag", "Ammann", "Weber"),
+        (60, 12000), (2, 100), None, (60, 900), ("Benzyna", "Diesel"),
+        ("Zraszacz", "Rewers", "Miernik zagęszczenia", "Kółka transportowe"),
+    ),
+    "Podnośniki": (
+        ("Podnośnik nożycowy", "Podnośnik koszowy", "Podnośnik teleskopowy", "Ładowarka teleskopowa"),
+        ("Genie", "JLG", "Haulotte", "Manitou", "Merlo"),
+        (1000, 15000), (5, 90), (6, 45), (150, 900), ("Elektryczny", "Diesel", "Hybrydowy"),
+        ("Napęd 4x4", "Kosz 2-osobowy", "Poziomowanie", "Opony niebrudzące"),
+    ),
+    "Agregaty": (
+        ("Agregat prądotwórczy", "Kompresor", "Nagrzewnica"),
+        ("Atlas Copco", "SDMO", "Pramac", "Kaeser"),
+        (100, 5000), (5, 500), None, (80, 1200), ("Diesel", "Benzyna"),
+        ("Wyciszona obudowa", "Automatyczny rozruch", "Wózek transportowy", "Licznik motogodzin"),
+    ),
+    "Betoniarki": (
+        ("Betoniarka", "Pompa do betonu", "Mieszarka do tynku"),
+        ("Atika", "Schwing", "Putzmeister", "Altrad"),
+        (80, 30000), (1, 350), (2, 56), (40, 2500), ("Elektryczny", "Diesel"),
+        ("Bęben 180 l", "Zdalne sterowanie", "Myjka ciśnieniowa"),
+    ),
+}
+
+FIRST_NAMES = ("Jan", "Anna", "Piotr", "Katarzyna", "Tomasz", "Magdalena", "Paweł", "Agnieszka", "Marcin", "Monika", "Krzysztof", "Joanna", "Michał", "Ewa", "Łukasz", "Barbara")
+LAST_NAMES = ("Nowak", "Kowalski", "Wiśniewski", "Wójcik", "Kamiński", "Lewandowski", "Zieliński", "Szymański", "Woźniak", "Dąbrowski", "Kozłowski", "Mazur", "Krawczyk", "Piotrowski")
+COMPANY_WORDS = ("Bud", "Dom", "Inwest", "Tech", "Mont", "Bet", "Stal", "Grunt", "Dach", "Pol", "Trans", "Rem")
+CITIES = ("Warszawa", "Kraków", "Łódź", "Wrocław", "Poznań", "Gdańsk", "Szczecin", "Lublin", "Katowice", "Białystok", "Rzeszów", "Olsztyn")
+STREETS = ("Budowlana", "Przemysłowa", "Lipowa", "Polna", "Leśna", "Słoneczna", "Krótka", "Szkolna", "Ogrodowa", "Kolejowa")
+
+# Długości wynajmu w dniach: (od, do) i waga
+RENTAL_LENGTHS = (((1, 3), 40), ((4, 7), 30), ((8, 14), 15), ((15, 30), 10), ((31, 90), 5))
+
+# Udział sprzętu w serwisie (wśród maszyn bez trwającej rezerwacji)
+MAINTENANCE_SHARE = 0.05
+
+
+def batched_rows(rows: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class DataGenerator:
+    def __init__(self, seed: int, today: date, history_days: int, future_days: int, batch_size: int):
+        self.rng = random.Random(seed)
+        self.today = today
+        self.now = datetime.combine(today, datetime.min.time()) + timedelta(hours=12)
+        self.horizon_start = today - timedelta(days=history_days)
+        self.horizon_days = history_days + future_days
+        self.batch_size = batch_size
+        self.stats = defaultdict(int)
+
+    def insert(self, connection, model, rows: Iterable[dict]):
+        table = model.__table__
+        for batch in batched_rows(rows, self.batch_size):
+            connection.execute(insert(table), batch)
+            self.stats[table.name] += len(batch)
+
+    # ----- klienci -----
+
+    def users(self, first_id: int, count: int, hashed_password: str) -> Iterator[dict]:
+        rng = self.rng
+        for user_id in range(first_id, first_id + count):
+            first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            if first_name.endswith("a") and last_name.endswith("i"):
+                last_name = last_name[:-1] + "a"  # Kowalski -> Kowalska
+            name = f"{first_name} {last_name}"
+            yield {
+                "id": user_id,
+                "name": name,
+                "email": f"klient{user_id}@example.pl",
+                "phone": f"+48 {rng.randint(500, 899)} {rng.randint(0, 999):03d} {rng.randint(0, 999):03d}",
+                "company": f"{rng.choice(COMPANY_WORDS)}{rng.choice(COMPANY_WORDS).lower()} Sp. z o.o.",
+                "nip": f"{rng.randint(0, 9999999999):010d}",
+                "address": f"ul. {rng.choice(STREETS)} {rng.randint(1, 150)}, {rng.randint(0, 99):02d}-{rng.randint(0, 999):03d} {rng.choice(CITIES)}",
+                "hashed_password": hashed_password,
+                "is_active": True,
+                "is_admin": False,
+                "created_at": self.now - timedelta(seconds=rng.randint(0, self.horizon_days * 86400)),
+            }
+
+    # ----- sprzęt -----
+
+    def equipment(self, first_id: int, count: int) -> Iterator[dict]:
+        rng = self.rng
+        categories = list(CATALOG)
+        for equipment_id in range(first_id, first_id + count):
+            category = rng.choice(categories)
+            kinds, brands, weight_range, power_range, reach_range, rate_range, fuels, features = CATALOG[category]
+            brand = rng.choice(brands)
+            model = f"{rng.choice('ABCDEHLMRSTX')}{rng.randint(10, 990)}"
+            weight = self._quantity(weight_range, "kg") if weight_range else "25kg/m²"
+            power = f"{rng.randint(*power_range)} kW" if power_range else "Brak"
+            reach = f"{rng.uniform(*reach_range):.1f}m" if reach_range else "Brak"
+            yield {
+                "id": equipment_id,
+                "name": f"{rng.choice(kinds)} {brand} {model}",
+                "category": category,
+                "daily_rate": float(rng.randrange(rate_range[0], rate_range[1] + 1, 5)),
+                "status": "available",
+                "description": f"{category} - {brand} {model}, sprzęt serwisowany i gotowy do pracy",
+                "weight": weight,
+                "fuel_type": rng.choice(fuels),
+                "power": power,
+                "reach": reach,
+                **equipment_numeric_attributes(weight, power, reach),
+                "image_url": None,
+                "features": json.dumps(rng.sample(features, rng.randint(1, min(4, len(features)))), ensure_ascii=False),
+                "specifications": json.dumps({"model": model, "rokProdukcji": str(rng.randint(2008, self.today.year))}),
+                "created_at": datetime.combine(self.horizon_start, datetime.min.time()) - timedelta(days=rng.randint(0, 365)),
+            }
+
+    def _quantity(self, value_range, unit: str) -> str:
+        value = self.rng.randint(*value_range)
+        return f"{value / 1000:.1f} ton" if value >= 1000 else f"{value}{unit}"
+
+    # ----- rezerwacje -----
+
+    def allocate(self, total: int, equipment_ids: List[int]) -> Dict[int, int]:
+        """Liczba rezerwacji per maszyna - rozkład skośny, najwyżej jedna na dzień horyzontu"""
+        capacity = self.horizon_days
+        if total > capacity * len(equipment_ids):
+            raise SystemExit(f"{total} rezerwacji nie zmieści się bez nakładania: maks. {capacity} na maszynę")
+        rng = self.rng
+        weights = [rng.lognormvariate(0, 1) for _ in equipment_ids]
+        counts = Counter(rng.choices(equipment_ids, weights, k=total))
+        overflow = 0
+        for equipment_id, count in counts.items():
+            if count > capacity:
+                overflow += count - capacity
+                counts[equipment_id] = capacity
+        for equipment_id in equipment_ids:
+            if not overflow:
+                break
+            extra = min(overflow, capacity - counts[equipment_id])
+            counts[equipment_id] += extra
+            overflow -= extra
+        return counts
+
+    def rental_days(self, count: int) -> List[int]:
+        """Wylosowane długości wynajmu (przed przycięciem do odcinka)"""
+        rng = self.rng
+        buckets = rng.choices([lengths for lengths, _ in RENTAL_LENGTHS], [weight for _, weight in RENTAL_LENGTHS], k=count)
+        return [low + int(rng.random() * (high - low + 1)) for low, high in buckets]
+
+    def reservations(self, first_id: int, equipment_rows: Dict[int, tuple], counts: Dict[int, int], customer_ids: List[int], sequences: Dict[int, int], rented: set, rules: CompiledRules) -> Iterator[dict]:
+        rng = self.rng
+        customer_weights = [rng.paretovariate(1.2) for _ in customer_ids]
+        total = sum(counts.values())
+        customers = iter(rng.choices(customer_ids, customer_weights, k=total))
+        # Dni horyzontu liczone raz - pętla poniżej tylko indeksuje
+        days_list = [self.horizon_start + timedelta(days=offset) for offset in range(self.horizon_days)]
+        day_starts = [datetime.combine(day, datetime.min.time()) for day in days_list]
+        day_ends = [datetime.combine(day, datetime.max.time()) for day in days_list]
+        lead_time = 31 * 86400  # rezerwacja składana do 30 dni przed startem
+        reservation_id = first_id
+        for equipment_id in sorted(counts):
+            count = counts[equipment_id]
+            if not count:
+                continue
+            daily_rate, category = equipment_rows[equipment_id]
+            # n-1 losowych cięć dzieli horyzont na n rozłącznych odcinków (min. 1 dzień)
+            cuts = [0] + sorted(rng.sample(range(1, self.horizon_days), count - 1)) + [self.horizon_days]
+            for slot_start, slot_end, wanted_days in zip(cuts, cuts[1:], self.rental_days(count)):
+                days = min(wanted_days, slot_end - slot_start)
+                first_day = slot_start + int(rng.random() * (slot_end - slot_start - days + 1))
+                last_day = first_day + days - 1
+                start_day, end_day = days_list[first_day], days_list[last_day]
+                status = self._status(start_day, end_day)
+                if status == "active":
+                    rented.add(equipment_id)
+                created_at = day_starts[first_day] - timedelta(seconds=int(rng.random() * lead_time))
+                if created_at > self.now:
+                    created_at = self.now - timedelta(seconds=int(rng.random() * lead_time))
+                year = created_at.year
+                number = sequences.get(year, 1)
+                sequences[year] = number + 1
+                yield {
+                    "id": reservation_id,
+                    "equipment_id": equipment_id,
+                    "customer_id": next(customers),
+                    "start_date": day_starts[first_day],
+                    "end_date": day_ends[last_day],
+                    "total_cost": rules.price(daily_rate, category, start_day, end_day).total,
+                    "status": status,
+                    "contract_number": f"SB/{year}/{number:06d}",
+                    "notes": None,
+                    "created_at": created_at,
+                }
+                reservation_id += 1
+
+    def _status(self, start_day: date, end_day: date) -> str:
+        chance = self.rng.random()
+        if end_day < self.today:
+            return "cancelled" if chance < 0.12 else "completed"
+        if start_day <= self.today:
+            return "active"
+        return "cancelled" if chance < 0.15 else "pending"
+
+
+def next_id(connection, model) -> int:
+    return (connection.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def advance_id_sequences(connection, models):
+    """
+    Wiersze wstawiamy z jawnymi id - na Postgresie sekwencje SERIAL o tym nie
+    wiedzą, więc przestaw je za największe id (inaczej następny zwykły INSERT
+    kończy się duplikatem klucza). SQLite bierze MAX(rowid) + 1 sam.
+    """
+    if connection.dialect.name != "postgresql":
+        return
+    for model in models:
+        table = model.__table__.name
+        connection.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {table}"
+        ))
+
+
+def generate(args) -> dict:
+    generator = DataGenerator(args.seed, args.today, args.history_days, args.future_days, args.batch_size)
+    started = time.perf_counter()
+
+    with engine.begin() as connection:
+        if args.reset:
+            for model in (Reservation, Equipment, User):
+                connection.execute(delete(model.__table__))
+            connection.execute(delete(NumberSequence.__table__).where(NumberSequence.name.like("contract:%")))
+
+        if connection.execute(select(User.id).where(User.email == ADMIN_EMAIL)).first() is None:
+            connection.execute(insert(User.__table__), {
+                "name": "Administrator", "email": ADMIN_EMAIL, "phone": "+48 123 456 789",
+                "company": "SpellBudex Sp. z o.o.", "nip": "1234567890",
+                "address": "ul. Budowlana 1, 00-001 Warszawa",
+                "hashed_password": hash_password(ADMIN_PASSWORD), "is_active": True, "is_admin": True,
+                "created_at": generator.now,
+            })
+
+    with engine.begin() as connection:
+        # Jeden hash dla wszystkich klientów - bcrypt na każdego trwałby godzinami
+        first_user = next_id(connection, User)
+        generator.insert(connection, User, generator.users(first_user, args.users, hash_password(args.password)))
+        first_equipment = next_id(connection, Equipment)
+        generator.insert(connection, Equipment, generator.equipment(first_equipment, args.equipment))
+    customer_ids = list(range(first_user, first_user + args.users))
+
+    if args.reservations:
+        if not customer_ids or not args.equipment:
+            raise SystemExit("Rezerwacje wymagają co najmniej jednego klienta i jednej maszyny")
+        with engine.begin() as connection:
+            equipment_rows = {
+                row.id: (row.daily_rate, row.category)
+                for row in connection.execute(select(Equipment.id, Equipment.daily_rate, Equipment.category).where(Equipment.id >= first_equipment))
+            }
+            sequences = {
+                int(row.name.split(":")[1]): row.next_value
+                for row in connection.execute(select(NumberSequence).where(NumberSequence.name.like("contract:%")))
+            }
+            rented = set()
+            counts = generator.allocate(args.reservations, sorted(equipment_rows))
+            # Reguły wycen na tym samym połączeniu (bez drugiego z puli)
+            with Session(bind=connection) as db:
+                rules = pricing_engine.rules(db)
+            generator.insert(connection, Reservation, generator.reservations(
+                next_id(connection, Reservation), equipment_rows, counts, customer_ids, sequences, rented, rules
+            ))
+
+            # Sekwencje numerów umów za ostatnim wydanym numerem
+            table = NumberSequence.__table__
+            for year, value in sequences.items():
+                name = f"contract:{year}"
+                if connection.execute(table.update().where(table.c.name == name).values(next_value=value)).rowcount == 0:
+                    connection.execute(insert(table), {"name": name, "next_value": value})
+            contract_numbers.reset()
+
+            # Status sprzętu spójny z rezerwacjami: trwający wynajem = rented
+            table = Equipment.__table__
+            statuses = {"rented": sorted(rented)}
+            idle = [equipment_id for equipment_id in sorted(equipment_rows) if equipment_id not in rented]
+            statuses["maintenance"] = [equipment_id for equipment_id in idle if generator.rng.random() < MAINTENANCE_SHARE]
+            for new_status, ids in statuses.items():
+                for position in range(0, len(ids), 500):
+                    connection.execute(table.update().where(table.c.id.in_(ids[position:position + 500])).values(status=new_status))
+
+    with engine.begin() as connection:
+        advance_id_sequences(connection, (User, Equipment, Reservation))
+    generated_at = time.perf_counter()
+
+    db = SessionLocal()
+    try:
+        rebuild_statistics(db)
+        rebuild_search_index(db)
+        db.commit()
+    finally:
+        db.close()
+
+    return {
+        "inserted": dict(generator.stats),
+        "generate_s": round(generated_at - started, 2),
+        "rebuild_s": round(time.perf_counter() - generated_at, 2),
+    }
+
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--equipment", type=int, default=500)
+    parser.add_argument("--reservations", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--today", type=date.fromisoformat, default=date.today(), help="dzień odniesienia dla statusów (RRRR-MM-DD)")
+    parser.add_argument("--history-days", type=int, default=730, help="ile dni wstecz sięgają rezerwacje")
+    parser.add_argument("--future-days", type=int, default=180, help="ile dni naprzód sięgają rezerwacje")
+    parser.add_argument("--batch-size", type=int, default=10000, help="wiersze w jednym executemany")
+    parser.add_argument("--password", default="spellbudex123", help="hasło wszystkich klientów")
+    parser.add_argument("--reset", action="store_true", help="usuń istniejących użytkowników, sprzęt i rezerwacje")
+    args = parser.parse_args()
+    result = generate(args)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    run()
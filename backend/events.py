@@ -0,0 +1,169 @@
+# backend/events.py
+"""
+Hub zdarzeń w pamięci procesu dla strumienia SSE (GET /api/events).
+
+Ścieżki zapisu (wątki puli) wołają `publish` po commicie - zdarzenie jest
+serializowane raz i przekazywane do pętli zdarzeń przez call_soon_threadsafe,
+więc handler nie czeka na subskrybentów. Na pętli wiadomość trafia do
+ograniczonej kolejki każdego subskrybenta (put_nowait); kto nie nadąża
+i ma pełną kolejkę, jest odłączany - przeglądarka połączy się ponownie
+z Last-Event-ID i dostanie brakujące zdarzenia z bufora powtórek albo
+zdarzenie `reset` (pobierz stan od nowa).
+
+Hub widzi tylko zapisy swojego workera; zmiany z innych workerów
+docierają najwyżej jako `reset`/`lifecycle` (przez generację schedulera).
+"""
+from collections import deque
+from typing import Any, AsyncIterator, Dict, Optional
+import asyncio
+import json
+import os
+import uuid
+
+# Wiadomości czekające na wysłanie do jednego subskrybenta
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "256"))
+
+# Ostatnie zdarzenia trzymane do wznowienia po Last-Event-ID
+EVENTS_REPLAY_SIZE = int(os.getenv("EVENTS_REPLAY_SIZE", "1000"))
+
+# Limit otwartych strumieni na workera
+EVENTS_MAX_SUBSCRIBERS = int(os.getenv("EVENTS_MAX_SUBSCRIBERS", "1000"))
+
+# Komentarz podtrzymujący połączenie (proxy zamykają bezczynne połączenia)
+EVENTS_HEARTBEAT = float(os.getenv("EVENTS_HEARTBEAT", "15"))
+
+# Po tylu sekundach serwer kończy strumień, a klient łączy się ponownie -
+# połączenia rozkładają się między workery i nie blokują restartu
+EVENTS_MAX_STREAM_SECONDS = float(os.getenv("EVENTS_MAX_STREAM_SECONDS", "300"))
+
+# Ile ms przeglądarka czeka przed ponownym połączeniem
+EVENTS_RETRY_MS = int(os.getenv("EVENTS_RETRY_MS", "3000"))
+
+HEARTBEAT_MESSAGE = b": ping\n\n"
+
+
+class HubFull(Exception):
+    """Osiągnięto limit subskrybentów"""
+
+
+def format_event(event_id: Optional[str], event_type: str, payload: str) -> bytes:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event_type}")
+    lines.append(f"data: {payload}")
+    return ("\n".join(lines) + "\n\n").encode("utf-8")
+
+
+class Subscriber:
+    __slots__ = ("queue", "evicted")
+
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self.evicted = False
+
+
+class EventHub:
+    def __init__(self, queue_size: int = EVENTS_QUEUE_SIZE, replay_size: int = EVENTS_REPLAY_SIZE, max_subscribers: int = EVENTS_MAX_SUBSCRIBERS):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        # Identyfikatory zdarzeń "<instancja>-<numer>" - po restarcie albo na
+        # innym workerze Last-Event-ID nie pasuje i klient dostaje reset
+        self.instance = uuid.uuid4().hex[:8]
+        self.evicted = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscribers = set()
+        self._replay = deque(maxlen=replay_size)  # (numer, wiadomość)
+        self._last_number = 0
+        self._reset_message = format_event(None, "reset", "{}")
+        self._evicted_message = format_event(None, "evicted", "{}")
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def bind(self):
+        """Podepnij hub pod bieżącą pętlę zdarzeń (start aplikacji)"""
+        self._loop = asyncio.get_running_loop()
+
+    def unbind(self):
+        self._loop = None
+
+    def publish(self, event_type: str, data: Dict[str, Any]):
+        """Wyślij zdarzenie do subskrybentów - bezpieczne z dowolnego wątku, nie blokuje"""
+        loop = self._loop
+        if loop is None:
+            return
+        payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        try:
+            loop.call_soon_threadsafe(self._dispatch, event_type, payload)
+        except RuntimeError:
+            # Pętla już zamknięta (wyłączanie serwera)
+            pass
+
+    def _dispatch(self, event_type: str, payload: str):
+        self._last_number += 1
+        message = format_event(f"{self.instance}-{self._last_number}", event_type, payload)
+        self._replay.append((self._last_number, message))
+        for subscriber in self._subscribers:
+            if subscriber.evicted:
+                continue
+            try:
+                subscriber.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self._evict(subscriber)
+
+    def _evict(self, subscriber: Subscriber):
+        """Wolny odbiorca: porzuć zaległości, zostaw tylko informację o odłączeniu"""
+        subscriber.evicted = True
+        self.evicted += 1
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(self._evicted_message)
+
+    def _missed_messages(self, last_event_id: str):
+        """Zdarzenia po Last-Event-ID albo None, jeśli nie da się ich odtworzyć"""
+        instance, _, number = last_event_id.partition("-")
+        if instance != self.instance or not number.isdigit():
+            return None
+        number = int(number)
+        oldest = self._replay[0][0] if self._replay else self._last_number + 1
+        if number > self._last_number or number < oldest - 1:
+            return None
+        missed = [message for event_number, message in self._replay if event_number > number]
+        return missed if len(missed) < self.queue_size else None
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> Subscriber:
+        """Wywoływane na pętli zdarzeń (handler async)"""
+        if len(self._subscribers) >= self.max_subscribers:
+            raise HubFull()
+        subscriber = Subscriber(self.queue_size)
+        if last_event_id:
+            missed = self._missed_messages(last_event_id)
+            for message in missed if missed is not None else [self._reset_message]:
+                subscriber.queue.put_nowait(message)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self._subscribers.discard(subscriber)
+
+    async def stream(self, subscriber: Subscriber, heartbeat: float = EVENTS_HEARTBEAT, max_duration: float = EVENTS_MAX_STREAM_SECONDS) -> AsyncIterator[bytes]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max_duration
+        try:
+            yield f"retry: {EVENTS_RETRY_MS}\n\n".encode("ascii")
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return
+                try:
+                    message = await asyncio.wait_for(subscriber.queue.get(), min(heartbeat, remaining))
+                except asyncio.TimeoutError:
+                    yield HEARTBEAT_MESSAGE
+                    continue
+                yield message
+                if message is self._evicted_message:
+                    return
+        finally:
+            self.unsubscribe(subscriber)
@@ -1,36 +1,103 @@
 # ===== main.py =====
-from fastapi import FastAPI, HTTPException, Depends, status
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Boolean, Date, DateTime, Text, ForeignKey, Index, event, func, insert, select, update, bindparam
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session, relationship
-from pydantic import BaseModel, EmailStr, validator
+from sqlalchemy.orm import sessionmaker, Session, relationship, load_only, joinedload
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
+from pydantic import BaseModel, EmailStr, ValidationError, validator
 from typing import List, Optional
 from datetime import datetime, timedelta, date
 import jwt
-import bcrypt
 import os
-from contextlib import contextmanager
+from contextlib import contextmanager, asynccontextmanager
+import anyio
 from google.auth.transport import Request as google_request
 from google.oauth2 import id_token
 import json
+import base64
+import random
+import time
+from availability import BLOCKING_STATUSES, compute_windows
+from cache import CatalogCache, PrincipalCache, RowCache, SharedVersion, etag_matches
+from passwords import PasswordHasher, HashingPoolSaturated
+from database import DATABASE_URL, DB_POOL_CAPACITY, add_missing_columns, build_engine
+import metrics
+from sequences import BlockSequenceAllocator
+from search import EquipmentSearchIndex, SOURCE_FIELDS, query_tokens
+from units import parse_length_m, parse_power_kw, parse_weight_kg
+from pricing import PricingEngine, PricingError, PromotionRule
+from scheduler import SCHEDULER_ENABLED, LeaderLease, PeriodicJob
+from events import EventHub, HubFull
+from bulk_import import (
+    BULK_CHUNK_SIZE, ImportFormatError, ImportReport, batched, detect_format,
+    iter_request_body, iter_rows, parse_list_field, parse_object_field, validation_message
+)
+import request_log
 
 # Importuj nasze middleware
-#from middleware import AuthMiddleware, SecurityMiddleware, RateLimitMiddleware, CORSMiddleware
+from middleware import ApiGatewayMiddleware
 # Konfiguracja
 SECRET_KEY = os.getenv("SECRET_KEY", "spellbudex_secret_key_2025")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-# Database setup
-SQLALCHEMY_DATABASE_URL = "sqlite:///./spellbudex.db"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+# Handlery korzystające z bazy są synchroniczne i działają w puli wątków
+# (nie blokują pętli zdarzeń) - tu jej rozmiar. Każdy wątek trzyma najwyżej
+# jedno połączenie, więc pula wątków nie może przekroczyć puli połączeń
+# (inaczej wątki czekają pool_timeout i kończą się błędem 500)
+DB_THREADPOOL_SIZE = min(int(os.getenv("DB_THREADPOOL_SIZE", "40")), DB_POOL_CAPACITY)
+
+# Rate limiting - domyślnie 200 requestów na minutę
+RATE_LIMIT_CALLS = int(os.getenv("RATE_LIMIT_CALLS", "200"))
+RATE_LIMIT_PERIOD = int(os.getenv("RATE_LIMIT_PERIOD", "60"))
+
+# Jak długo (s) trzymamy zalogowanego użytkownika w cache bez pytania bazy
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
+
+# Rezerwacje: ponowienia przy blokadzie/zakleszczeniu i limit pozycji w zamówieniu
+RESERVATION_RETRIES = int(os.getenv("RESERVATION_RETRIES", "3"))
+RESERVATION_RETRY_DELAY = float(os.getenv("RESERVATION_RETRY_DELAY", "0.05"))
+MAX_BATCH_ITEMS = int(os.getenv("MAX_BATCH_ITEMS", "50"))
+
+# Liczniki statystyk: wierszy na licznik - transakcja dopisuje do losowego
+# shardu, więc równoległe rezerwacje nie kolejkują się na jednym wierszu
+STAT_COUNTER_SHARDS = int(os.getenv("STAT_COUNTER_SHARDS", "8"))
+
+# Maksymalna liczba linii w jednej wycenie
+MAX_QUOTE_LINES = int(os.getenv("MAX_QUOTE_LINES", "500"))
+
+# Paginacja list (keyset po id)
+DEFAULT_PAGE_SIZE = int(os.getenv("PAGE_SIZE_DEFAULT", "100"))
+MAX_PAGE_SIZE = int(os.getenv("PAGE_SIZE_MAX", "1000"))
+
+# Database setup (DATABASE_URL, profil SQLite/Postgres w database.py)
+SQLALCHEMY_DATABASE_URL = DATABASE_URL
+engine = build_engine(SQLALCHEMY_DATABASE_URL)
+metrics.instrument_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Ograniczona pula wątków dla synchronicznych handlerów i zależności
+    anyio.to_thread.current_default_thread_limiter().total_tokens = DB_THREADPOOL_SIZE
+    password_hasher.start()
+    event_hub.bind()
+    if SCHEDULER_ENABLED:
+        lifecycle_job.start()
+    yield
+    await lifecycle_job.stop()
+    event_hub.unbind()
+    password_hasher.shutdown()
+
 # FastAPI app
 app = FastAPI(
+    lifespan=lifespan,
     title="SpellBudex API",
     description="API dla wypożyczalni sprzętu budowlanego SpellBudex",
     version="1.0.0",
@@ -40,30 +107,24 @@ app = FastAPI(
 
 # ===== MIDDLEWARE SETUP =====
 
-# 1. Security Middleware (pierwszy - najważniejszy)
-#app.add_middleware(SecurityMiddleware)
-
-# 2. Custom CORS Middleware (drugi - obsługuje CORS)
-#app.add_middleware(CORSMiddleware)
-
-# 3. Rate Limiting Middleware (trzeci - ogranicza ruch)
-#app.add_middleware(RateLimitMiddleware, calls=200, period=60)  # 200 requestów na minutę
-
-# 4. Auth Middleware (ostatni - sprawdza autoryzację)
-#app.add_middleware(AuthMiddleware)
-
-# ===== BACKUP CORS (na wszelki wypadek) =====
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:3000", "http://127.0.0.1:3000"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Jeden middleware ASGI: nagłówki bezpieczeństwa, CORS, rate limiting
+# i polityka autoryzacji (tabela tras w middleware.py)
+app.add_middleware(ApiGatewayMiddleware, calls=RATE_LIMIT_CALLS, period=RATE_LIMIT_PERIOD)
 
 # Security
 security = HTTPBearer()
 
+# Hashowanie haseł w puli procesów (poza pętlą zdarzeń i pulą wątków)
+password_hasher = PasswordHasher()
+
+@app.exception_handler(HashingPoolSaturated)
+async def hashing_pool_saturated_handler(request: Request, exc: HashingPoolSaturated):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Serwer jest przeciążony. Spróbuj ponownie za chwilę."},
+        headers={"Retry-After": "1"}
+    )
+
 # ===== DATABASE MODELS =====
 
 class User(Base):
@@ -97,6 +158,10 @@ class Equipment(Base):
     fuel_type = Column(String)
     power = Column(String)
     reach = Column(String)
+    # Wartości liczbowe parsowane z weight/power/reach przy zapisie (filtry zakresów)
+    weight_kg = Column(Float, index=True)
+    power_kw = Column(Float, index=True)
+    reach_m = Column(Float, index=True)
     image_url = Column(String)
     features = Column(Text)  # JSON string
     specifications = Column(Text)  # JSON string
@@ -122,9 +187,140 @@ class Reservation(Base):
     # Relationships
     equipment = relationship("Equipment", back_populates="reservations")
     customer = relationship("User", back_populates="reservations")
+    
+    __table_args__ = (
+        # Indeks pod sprawdzanie kolizji rezerwacji
+        Index("ix_reservations_availability", "equipment_id", "status", "start_date", "end_date"),
+        # Indeks pod przejścia statusów według dat (scheduler)
+        Index("ix_reservations_lifecycle", "status", "start_date"),
+    )
+
+# Liczniki i przychód są rozbite na shardy - wartość to suma shardów
+class StatCounter(Base):
+    __tablename__ = "stat_counter_shards"
+    
+    key = Column(String, primary_key=True)  # np. "equipment:available", "reservations:total"
+    shard = Column(Integer, primary_key=True, default=0)  # 0..STAT_COUNTER_SHARDS-1
+    value = Column(Integer, default=0)
+
+class RevenueDaily(Base):
+    __tablename__ = "revenue_daily_shards"
+    
+    day = Column(Date, primary_key=True)  # dzień utworzenia rezerwacji
+    shard = Column(Integer, primary_key=True, default=0)
+    amount = Column(Float, default=0.0)
+
+class Promotion(Base):
+    __tablename__ = "promotions"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String)
+    code = Column(String, unique=True, nullable=True)  # None = naliczana automatycznie
+    category = Column(String, nullable=True)  # None = wszystkie kategorie
+    discount_percent = Column(Float)
+    valid_from = Column(Date, nullable=True)
+    valid_until = Column(Date, nullable=True)
+    is_active = Column(Boolean, default=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class NumberSequence(Base):
+    __tablename__ = "number_sequences"
+    
+    name = Column(String, primary_key=True)  # np. "contract:2025"
+    next_value = Column(Integer, nullable=False)  # pierwszy numer niewydany jeszcze żadnemu workerowi
+
+class SchedulerLease(Base):
+    __tablename__ = "scheduler_leases"
+    
+    name = Column(String, primary_key=True)  # np. "reservation-lifecycle"
+    holder = Column(String)  # host:pid:sufiks workera-lidera
+    expires_at = Column(DateTime)  # UTC
+    generation = Column(Integer, default=0)  # podbijana po przebiegu, który coś zmienił
+
+class CacheVersion(Base):
+    __tablename__ = "cache_versions"
+    
+    name = Column(String, primary_key=True)  # np. "catalog"
+    value = Column(Integer, nullable=False, default=0)  # podbijana po każdym zapisie danych
+
+# Indeks wyszukiwania pełnotekstowego (FTS5 na SQLite)
+search_index = EquipmentSearchIndex(engine)
 
 # Create tables
-Base.metadata.create_all(bind=engine)
+def create_schema(attempts: int = 3) -> List[str]:
+    """Utwórz brakujące tabele, kolumny i indeksy; zwraca dodane kolumny"""
+    added_columns = []
+    for attempt in range(attempts):
+        try:
+            Base.metadata.create_all(bind=engine)
+            added_columns += add_missing_columns(engine, Base.metadata)
+            
+            # create_all pomija istniejące tabele, więc indeksy dodane później tworzymy osobno
+            for table in Base.metadata.sorted_tables:
+                for table_index in table.indexes:
+                    table_index.create(bind=engine, checkfirst=True)
+            
+            with engine.begin() as connection:
+                search_index.create(connection)
+            return added_columns
+        except OperationalError:
+            # Kilka workerów startuje naraz i tworzy te same tabele - sprawdź jeszcze raz
+            if attempt == attempts - 1:
+                raise
+            time.sleep(0.2 * (attempt + 1))
+
+schema_added_columns = create_schema()
+
+# Numery umów wydawane blokami z tabeli sekwencji
+contract_numbers = BlockSequenceAllocator(SessionLocal, NumberSequence)
+
+# Cache odpowiedzi katalogu sprzętu (unieważniany licznikiem wersji wspólnym
+# dla workerów - wiersz "catalog" w tabeli cache_versions)
+catalog_cache = CatalogCache(shared=SharedVersion(SessionLocal, CacheVersion, "catalog"))
+
+# Cache wyrenderowanych wierszy sprzętu (per id, ważny do zmiany wiersza)
+equipment_render_cache = RowCache()
+
+# Cache zalogowanych użytkowników (token -> niezmienny snapshot); zmiana roli
+# albo dezaktywacja na dowolnym workerze podbija wiersz "principals"
+principal_cache = PrincipalCache(ttl=PRINCIPAL_CACHE_TTL, shared=SharedVersion(SessionLocal, CacheVersion, "principals"))
+
+def load_promotion_rules(db: Session) -> List[PromotionRule]:
+    """Aktywne promocje jako niezmienne reguły dla silnika wycen (sesja żądania)"""
+    rows = db.query(
+        Promotion.id, Promotion.name, Promotion.code, Promotion.category,
+        Promotion.discount_percent, Promotion.valid_from, Promotion.valid_until
+    ).filter(Promotion.is_active.is_(True)).all()
+    return [PromotionRule(*row) for row in rows]
+
+# Silnik wycen (reguły kompilowane raz, unieważniane przy zmianie promocji)
+pricing_engine = PricingEngine(load_promotion_rules)
+
+# Zdarzenia SSE dla dashboardu i kalendarza (GET /api/events)
+event_hub = EventHub()
+
+# Metryki cache i kolejki hashowania (odczytywane przy scrapowaniu /metrics)
+metrics.register_caches({
+    "catalog": catalog_cache,
+    "equipment_render": equipment_render_cache,
+    "principal": principal_cache,
+})
+metrics.registry.register(metrics.Gauge(
+    "spellbudex_password_hash_queue_depth", "Operacje bcrypt w kolejce lub w trakcie",
+    callback=lambda: password_hasher.queue_depth
+))
+metrics.registry.register(metrics.Gauge(
+    "spellbudex_log_records_dropped", "Rekordy logu odrzucone przy pełnej kolejce",
+    callback=lambda: request_log.queue_handler.dropped if request_log.queue_handler else 0
+))
+metrics.registry.register(metrics.Gauge(
+    "spellbudex_event_subscribers", "Otwarte strumienie /api/events",
+    callback=lambda: event_hub.subscriber_count
+))
+metrics.registry.register(metrics.Gauge(
+    "spellbudex_event_subscribers_evicted", "Strumienie odłączone za przepełnienie bufora",
+    callback=lambda: event_hub.evicted
+))
 
 # ===== PYDANTIC MODELS =====
 
@@ -168,6 +364,98 @@ class UserResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class Principal(UserResponse):
+    """Niezmienny snapshot zalogowanego użytkownika (trzymany w cache)"""
+    
+    class Config:
+        from_attributes = True
+        frozen = True
+
+class UserAdminUpdate(BaseModel):
+    is_active: Optional[bool] = None
+    is_admin: Optional[bool] = None
+
+class PromotionCreate(BaseModel):
+    name: str
+    code: Optional[str] = None
+    category: Optional[str] = None
+    discount_percent: float
+    valid_from: Optional[date] = None
+    valid_until: Optional[date] = None
+    is_active: bool = True
+    
+    @validator('discount_percent')
+    def validate_discount(cls, v):
+        if not 0 < v < 100:
+            raise ValueError('Rabat musi być większy od 0 i mniejszy od 100%')
+        return v
+
+class PromotionUpdate(BaseModel):
+    name: Optional[str] = None
+    code: Optional[str] = None
+    category: Optional[str] = None
+    discount_percent: Optional[float] = None
+    valid_from: Optional[date] = None
+    valid_until: Optional[date] = None
+    is_active: Optional[bool] = None
+    
+    @validator('discount_percent')
+    def validate_discount(cls, v):
+        if v is not None and not 0 < v < 100:
+            raise ValueError('Rabat musi być większy od 0 i mniejszy od 100%')
+        return v
+
+class PromotionResponse(BaseModel):
+    id: int
+    name: str
+    code: Optional[str] = None
+    category: Optional[str] = None
+    discount_percent: float
+    valid_from: Optional[date] = None
+    valid_until: Optional[date] = None
+    is_active: bool
+    
+    class Config:
+        from_attributes = True
+
+class QuoteLineRequest(BaseModel):
+    equipment_id: int
+    start_date: date
+    end_date: date
+
+class QuoteRequest(BaseModel):
+    items: List[QuoteLineRequest]
+    promo_code: Optional[str] = None
+    
+    @validator('items')
+    def validate_items(cls, v):
+        if not v:
+            raise ValueError('Wycena musi zawierać co najmniej jedną pozycję')
+        if len(v) > MAX_QUOTE_LINES:
+            raise ValueError(f'Wycena może zawierać najwyżej {MAX_QUOTE_LINES} pozycji')
+        return v
+
+class QuoteLineResponse(BaseModel):
+    equipment_id: int
+    equipment_name: str
+    category: str
+    start_date: date
+    end_date: date
+    days: int
+    weekend_days: int
+    daily_rate: float
+    base_amount: float
+    tier_discount_percent: float
+    promotion: Optional[str] = None
+    promotion_discount_percent: float = 0.0
+    total: float
+
+class QuoteResponse(BaseModel):
+    lines: List[QuoteLineResponse]
+    base_amount: float
+    total: float
+    currency: str = "PLN"
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -200,6 +488,31 @@ class EquipmentUpdate(BaseModel):
     features: Optional[List[str]] = None
     specifications: Optional[dict] = None
 
+EQUIPMENT_STATUSES = ("available", "rented", "maintenance")
+
+class EquipmentImportRow(EquipmentCreate):
+    """Wiersz importu: z id - aktualizacja istniejącego sprzętu, bez id - nowy sprzęt"""
+    id: Optional[int] = None
+    status: Optional[str] = None  # brak = "available" dla nowych, bez zmiany dla istniejących
+    
+    @validator('id', 'status', 'image_url', pre=True)
+    def empty_as_none(cls, v):
+        return None if isinstance(v, str) and not v.strip() else v
+    
+    @validator('features', pre=True)
+    def parse_features(cls, v):
+        return parse_list_field(v)
+    
+    @validator('specifications', pre=True)
+    def parse_specifications(cls, v):
+        return parse_object_field(v)
+    
+    @validator('status')
+    def validate_status(cls, v):
+        if v is not None and v not in EQUIPMENT_STATUSES:
+            raise ValueError(f"Dozwolone statusy: {', '.join(EQUIPMENT_STATUSES)}")
+        return v
+
 class EquipmentResponse(BaseModel):
     id: int
     name: str
@@ -211,6 +524,9 @@ class EquipmentResponse(BaseModel):
     fuel_type: str
     power: str
     reach: str
+    weight_kg: Optional[float] = None
+    power_kw: Optional[float] = None
+    reach_m: Optional[float] = None
     image_url: Optional[str] = None
     features: List[str] = []
     specifications: dict = {}
@@ -220,11 +536,49 @@ class EquipmentResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class EquipmentSearchHit(EquipmentResponse):
+    score: float
+
+class EquipmentSearchResponse(BaseModel):
+    query: str
+    total: int
+    items: List[EquipmentSearchHit]
+    facets: dict  # {"category": {nazwa: liczba}, "fuel_type": {...}}
+
+class AvailabilityWindow(BaseModel):
+    start: date
+    end: date
+
+class EquipmentAvailability(BaseModel):
+    equipment_id: int
+    name: str
+    category: str
+    status: str
+    busy: List[AvailabilityWindow] = []
+    free: List[AvailabilityWindow] = []
+
 class ReservationCreate(BaseModel):
     equipment_id: int
     start_date: date
     end_date: date
     notes: Optional[str] = None
+    promo_code: Optional[str] = None
+
+class ReservationBatchCreate(BaseModel):
+    items: List[ReservationCreate]
+    notes: Optional[str] = None  # dla pozycji bez własnych notatek
+    promo_code: Optional[str] = None  # dla pozycji bez własnego kodu
+    
+    @validator('items')
+    def validate_items(cls, v):
+        if not v:
+            raise ValueError('Zamówienie musi zawierać co najmniej jedną pozycję')
+        if len(v) > MAX_BATCH_ITEMS:
+            raise ValueError(f'Zamówienie może zawierać najwyżej {MAX_BATCH_ITEMS} pozycji')
+        equipment_ids = [item.equipment_id for item in v]
+        if len(set(equipment_ids)) != len(equipment_ids):
+            raise ValueError('Ten sam sprzęt występuje w zamówieniu więcej niż raz')
+        return v
 
 class ReservationResponse(BaseModel):
     id: int
@@ -253,10 +607,10 @@ def get_db():
         db.close()
 
 def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    return password_hasher.hash(password)
 
 def verify_password(password: str, hashed_password: str) -> bool:
-    return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+    return password_hasher.verify(password, hashed_password)
 
 def create_access_token(data: dict):
     to_encode = data.copy()
@@ -265,24 +619,150 @@ def create_access_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
-    try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
+def get_current_user(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)) -> Principal:
+    token = credentials.credentials
+    principal = principal_cache.get(token)
+    if principal is not None and principal.is_admin:
+        # Uprawnienia administratora bez okna nieaktualności - wersja
+        # wspólna sprawdzana przy każdym żądaniu (zapytanie po kluczu)
+        principal_cache.sync(force=True)
+        principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+    
+    # Middleware zdekodował już ten sam nagłówek Authorization
+    payload = getattr(request.state, "token_claims", None)
+    if payload is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except jwt.PyJWTError:
             raise HTTPException(status_code=401, detail="Invalid authentication credentials")
-    except jwt.PyJWTError:
+    email: str = payload.get("sub")
+    if email is None:
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
     
     user = db.query(User).filter(User.email == email).first()
     if user is None:
         raise HTTPException(status_code=401, detail="User not found")
-    return user
+    
+    if not user.is_active:
+        raise HTTPException(status_code=401, detail="Konto zostało dezaktywowane")
+    
+    principal = Principal.model_validate(user)
+    # Zakończ transakcję odczytu - połączenie wraca do puli, zanim handler
+    # sięgnie po osobne (np. przydział bloku numerów umów)
+    db.rollback()
+    principal_cache.store(token, email, principal, payload["exp"] - time.time() if "exp" in payload else None)
+    return principal
+
+def has_conflicting_reservation(db: Session, equipment_id: int, start_datetime: datetime, end_datetime: datetime) -> bool:
+    # Baza jest źródłem prawdy (rezerwacje i anulowania z innych workerów);
+    # zapytanie idzie po indeksie złożonym ix_reservations_availability
+    existing_reservation = db.query(Reservation.id).filter(
+        Reservation.equipment_id == equipment_id,
+        Reservation.status.in_(BLOCKING_STATUSES),
+        Reservation.start_date <= end_datetime,
+        Reservation.end_date >= start_datetime
+    ).first()
+    return existing_reservation is not None
+
+def lock_equipment(db: Session, equipment_ids: List[int]) -> dict:
+    """
+    Zablokuj wiersze sprzętu do końca transakcji i zwróć je (id -> Equipment).
+    Blokady zawsze w kolejności id, więc zamówienia wielu maszyn się nie zakleszczają.
+    """
+    ids = sorted(set(equipment_ids))
+    query = db.query(Equipment).filter(Equipment.id.in_(ids)).populate_existing()
+    if engine.dialect.name == "sqlite":
+        # SQLite nie ma FOR UPDATE - pusty UPDATE od razu zajmuje blokadę zapisu
+        db.query(Equipment).filter(Equipment.id.in_(ids)).update(
+            {Equipment.id: Equipment.id}, synchronize_session=False
+        )
+        rows = query.all()
+    else:
+        rows = query.order_by(Equipment.id).with_for_update().all()
+    return {equipment.id: equipment for equipment in rows}
+
+def book_equipment(db: Session, customer_id: int, items: List[ReservationCreate], default_notes: Optional[str] = None, default_promo_code: Optional[str] = None) -> List[int]:
+    """
+    Utwórz rezerwacje dla wszystkich pozycji w jednej transakcji (wszystko albo nic).
+    Sprawdzenie dostępności i zapis odbywają się pod blokadą wierszy sprzętu,
+    więc dwa równoległe żądania nie zarezerwują tej samej maszyny.
+    """
+    # Numery umów przed blokadą - przydział bloku to osobna transakcja
+    contract_numbers_for_items = [generate_contract_number() for _ in items]
+    pricing_rules = pricing_engine.rules(db)
+    
+    def reject(status_code: int, detail: str, equipment_id: int):
+        db.rollback()
+        if len(items) > 1:
+            detail = f"{detail} (sprzęt #{equipment_id})"
+        raise HTTPException(status_code=status_code, detail=detail)
+    
+    for attempt in range(RESERVATION_RETRIES):
+        try:
+            equipment_by_id = lock_equipment(db, [item.equipment_id for item in items])
+            reservations = []
+            for item, contract_number in zip(items, contract_numbers_for_items):
+                equipment = equipment_by_id.get(item.equipment_id)
+                if not equipment:
+                    reject(404, "Sprzęt nie został znaleziony", item.equipment_id)
+                if equipment.status != "available":
+                    reject(400, "Sprzęt nie jest dostępny", item.equipment_id)
+                
+                start_datetime = datetime.combine(item.start_date, datetime.min.time())
+                end_datetime = datetime.combine(item.end_date, datetime.max.time())
+                if has_conflicting_reservation(db, item.equipment_id, start_datetime, end_datetime):
+                    reject(400, "Sprzęt jest już zarezerwowany w tym okresie", item.equipment_id)
+                
+                try:
+                    price = pricing_rules.price(
+                        equipment.daily_rate, equipment.category, item.start_date, item.end_date,
+                        item.promo_code or default_promo_code
+                    )
+                except PricingError as error:
+                    reject(400, str(error), item.equipment_id)
+                
+                reservation = Reservation(
+                    equipment_id=item.equipment_id,
+                    customer_id=customer_id,
+                    start_date=start_datetime,
+                    end_date=end_datetime,
+                    total_cost=price.total,
+                    contract_number=contract_number,
+                    notes=item.notes if item.notes is not None else default_notes
+                )
+                db.add(reservation)
+                reservations.append(reservation)
+                
+                track_equipment_status(db, equipment.status, "rented")
+                equipment.status = "rented"
+            
+            db.flush()
+            for reservation in reservations:
+                track_reservation_status(db, reservation, None, reservation.status)
+            booked = [
+                (reservation.id, reservation.equipment_id, reservation.start_date, reservation.end_date, reservation.status)
+                for reservation in reservations
+            ]
+            db.commit()
+            break
+        except OperationalError:
+            # Blokada nie doczekała się (SQLite busy) albo zakleszczenie - ponów
+            db.rollback()
+            if attempt == RESERVATION_RETRIES - 1:
+                raise HTTPException(status_code=503, detail="Sprzęt jest właśnie rezerwowany. Spróbuj ponownie.")
+            time.sleep(RESERVATION_RETRY_DELAY * (attempt + 1))
+    
+    for reservation_id, equipment_id, start_datetime, end_datetime, reservation_status in booked:
+        publish_reservation_event("created", reservation_id, equipment_id, reservation_status, start_datetime, end_datetime, "rented")
+    catalog_cache.bump()
+    return [reservation_id for reservation_id, _, _, _, _ in booked]
 
 def generate_contract_number() -> str:
-    return f"SB/{datetime.now().year}/{datetime.now().strftime('%m%d%H%M%S')}"
-
-import json
+    """Kolejny numer umowy w roku, np. SB/2025/000042"""
+    year = datetime.now().year
+    return f"SB/{year}/{contract_numbers.next_value(f'contract:{year}'):06d}"
 
 def serialize_features(features: List[str]) -> str:
     return json.dumps(features) if features else "[]"
@@ -302,6 +782,442 @@ def deserialize_specifications(specs_str: str) -> dict:
     except:
         return {}
 
+# Kolumny sprzętu, od których zależy odpowiedź API (wersja wiersza)
+EQUIPMENT_RESPONSE_COLUMNS = (
+    "name", "category", "daily_rate", "status", "description", "weight", "fuel_type",
+    "power", "reach", "weight_kg", "power_kw", "reach_m", "image_url", "features", "specifications", "created_at"
+)
+
+def render_equipment(equipment: Equipment):
+    """
+    Zwróć (EquipmentResponse, JSON bytes) dla wiersza sprzętu.
+    JSON z features/specifications jest parsowany tylko po zmianie wiersza.
+    """
+    row_version = tuple(getattr(equipment, column) for column in EQUIPMENT_RESPONSE_COLUMNS)
+    rendered = equipment_render_cache.get(equipment.id, row_version)
+    if rendered is not None:
+        return rendered
+    
+    response = EquipmentResponse(
+        id=equipment.id,
+        name=equipment.name,
+        category=equipment.category,
+        daily_rate=equipment.daily_rate,
+        status=equipment.status,
+        description=equipment.description,
+        weight=equipment.weight,
+        fuel_type=equipment.fuel_type,
+        power=equipment.power,
+        reach=equipment.reach,
+        weight_kg=equipment.weight_kg,
+        power_kw=equipment.power_kw,
+        reach_m=equipment.reach_m,
+        image_url=equipment.image_url,
+        features=deserialize_features(equipment.features),
+        specifications=deserialize_specifications(equipment.specifications),
+        available=equipment.status == "available",
+        created_at=equipment.created_at
+    )
+    return equipment_render_cache.store(equipment.id, row_version, (response, response.model_dump_json().encode("utf-8")))
+
+def equipment_to_response(equipment: Equipment) -> EquipmentResponse:
+    return render_equipment(equipment)[0]
+
+def equipment_fields_dict(equipment: Equipment, fields: List[str]) -> dict:
+    """Zserializuj tylko wybrane pola sprzętu (parametr fields=)"""
+    result = {}
+    for field in fields:
+        if field == "features":
+            result[field] = deserialize_features(equipment.features)
+        elif field == "specifications":
+            result[field] = deserialize_specifications(equipment.specifications)
+        elif field == "available":
+            result[field] = equipment.status == "available"
+        else:
+            result[field] = getattr(equipment, field)
+    return result
+
+def reservation_query(db: Session, with_equipment: bool = True, with_customer: bool = True):
+    """Zapytanie o rezerwacje z dociąganiem sprzętu i klienta w tym samym SELECT-cie (bez N+1)"""
+    query = db.query(Reservation)
+    if with_equipment:
+        query = query.options(joinedload(Reservation.equipment))
+    if with_customer:
+        query = query.options(joinedload(Reservation.customer))
+    return query
+
+def reservation_to_response(reservation: Reservation) -> ReservationResponse:
+    return ReservationResponse(
+        id=reservation.id,
+        equipment_id=reservation.equipment_id,
+        customer_id=reservation.customer_id,
+        start_date=reservation.start_date,
+        end_date=reservation.end_date,
+        total_cost=reservation.total_cost,
+        status=reservation.status,
+        contract_number=reservation.contract_number,
+        notes=reservation.notes,
+        created_at=reservation.created_at,
+        equipment=equipment_to_response(reservation.equipment),
+        customer=UserResponse.model_validate(reservation.customer)
+    )
+
+# ===== LIVE EVENTS =====
+
+def publish_equipment_event(action: str, equipment: Equipment):
+    """Delta sprzętu dla /api/events - wołać po commicie"""
+    event_hub.publish("equipment", {
+        "action": action,
+        "id": equipment.id,
+        "name": equipment.name,
+        "category": equipment.category,
+        "daily_rate": equipment.daily_rate,
+        "status": equipment.status,
+    })
+
+def publish_import_event(report: ImportReport):
+    """Podsumowanie importu zamiast delty na wiersz - klient pobiera katalog od nowa"""
+    if report.inserted or report.updated:
+        event_hub.publish("equipment", {"action": "imported", "inserted": report.inserted, "updated": report.updated})
+
+def publish_reservation_event(action: str, reservation_id: int, equipment_id: int, reservation_status: str, start_date: datetime, end_date: datetime, equipment_status: Optional[str]):
+    """Delta rezerwacji (bez danych klienta - strumień jest publiczny)"""
+    event_hub.publish("reservation", {
+        "action": action,
+        "id": reservation_id,
+        "equipment_id": equipment_id,
+        "status": reservation_status,
+        "start_date": start_date.date().isoformat(),
+        "end_date": end_date.date().isoformat(),
+        "equipment_status": equipment_status,
+    })
+
+# ===== STATISTICS COUNTERS =====
+
+# Statusy rezerwacji liczone do przychodu
+REVENUE_STATUSES = ("active", "completed")
+
+# Zmiany liczników zbierane w sesji i zapisywane dopiero przy commicie:
+# blokady wierszy liczników trwają tylko do końca commitu, a zapis idzie
+# w kolejności kluczy, więc dwie transakcje nie mogą się na nich zakleszczyć
+STATISTICS_DELTAS = "statistics_deltas"
+
+def pending_statistics(db: Session) -> dict:
+    return db.info.setdefault(STATISTICS_DELTAS, {"counters": {}, "revenue": {}})
+
+def bump_counter(db: Session, key: str, delta: int = 1):
+    """Zmień licznik w tej samej transakcji co zapis, który go dotyczy"""
+    if not key or not delta:
+        return
+    counters = pending_statistics(db)["counters"]
+    counters[key] = counters.get(key, 0) + delta
+
+def add_revenue(db: Session, day: date, amount: float):
+    if not amount:
+        return
+    revenue = pending_statistics(db)["revenue"]
+    revenue[day] = revenue.get(day, 0.0) + amount
+
+def increment_rows(db: Session, model, key_column: str, value_column: str, rows: list):
+    """Jedno INSERT ... ON CONFLICT DO UPDATE dodające wartości do shardów"""
+    dialect_insert = postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    statement = dialect_insert(model).values(rows)
+    db.execute(statement.on_conflict_do_update(
+        index_elements=[key_column, "shard"],
+        set_={value_column: getattr(model, value_column) + statement.excluded[value_column]},
+    ))
+
+@event.listens_for(SessionLocal, "before_commit")
+def apply_statistics(db: Session):
+    deltas = db.info.pop(STATISTICS_DELTAS, None)
+    if not deltas:
+        return
+    shard = random.randrange(STAT_COUNTER_SHARDS)
+    counters = [
+        {"key": key, "shard": shard, "value": delta}
+        for key, delta in sorted(deltas["counters"].items()) if delta
+    ]
+    revenue = [
+        {"day": day, "shard": shard, "amount": amount}
+        for day, amount in sorted(deltas["revenue"].items()) if amount
+    ]
+    if counters:
+        increment_rows(db, StatCounter, "key", "value", counters)
+    if revenue:
+        increment_rows(db, RevenueDaily, "day", "amount", revenue)
+
+@event.listens_for(SessionLocal, "after_soft_rollback")
+def discard_statistics(db: Session, previous_transaction):
+    # Ponowiona transakcja policzy zmiany od nowa
+    db.info.pop(STATISTICS_DELTAS, None)
+
+def read_counters(db: Session) -> dict:
+    """Wartości liczników (suma shardów)"""
+    return dict(db.query(StatCounter.key, func.sum(StatCounter.value)).group_by(StatCounter.key).all())
+
+def track_equipment_status(db: Session, old_status: Optional[str], new_status: Optional[str]):
+    if old_status == new_status:
+        return
+    if old_status:
+        bump_counter(db, f"equipment:{old_status}", -1)
+    if new_status:
+        bump_counter(db, f"equipment:{new_status}", 1)
+
+def track_reservation_status(db: Session, reservation: Reservation, old_status: Optional[str], new_status: str):
+    if old_status == new_status:
+        return
+    if old_status:
+        bump_counter(db, f"reservations:{old_status}", -1)
+    else:
+        bump_counter(db, "reservations:total", 1)
+    bump_counter(db, f"reservations:{new_status}", 1)
+    
+    was_revenue = old_status in REVENUE_STATUSES
+    is_revenue = new_status in REVENUE_STATUSES
+    if was_revenue != is_revenue:
+        add_revenue(db, reservation.created_at.date(), reservation.total_cost if is_revenue else -reservation.total_cost)
+
+def rebuild_statistics(db: Session):
+    """Przelicz liczniki od zera: jeden GROUP BY na tabelę + SUM przychodu per dzień"""
+    db.info.pop(STATISTICS_DELTAS, None)
+    db.query(StatCounter).delete(synchronize_session=False)
+    db.query(RevenueDaily).delete(synchronize_session=False)
+    
+    counters = {"equipment:total": 0, "reservations:total": 0}
+    for equipment_status, count in db.query(Equipment.status, func.count(Equipment.id)).group_by(Equipment.status):
+        counters[f"equipment:{equipment_status}"] = count
+        counters["equipment:total"] += count
+    for reservation_status, count in db.query(Reservation.status, func.count(Reservation.id)).group_by(Reservation.status):
+        counters[f"reservations:{reservation_status}"] = count
+        counters["reservations:total"] += count
+    counters["customers:total"] = db.query(func.count(User.id)).scalar()
+    db.add_all([StatCounter(key=key, value=value) for key, value in counters.items()])
+    
+    revenue_day = func.date(Reservation.created_at)
+    revenue = db.query(revenue_day, func.sum(Reservation.total_cost)).filter(
+        Reservation.status.in_(REVENUE_STATUSES)
+    ).group_by(revenue_day)
+    for day, amount in revenue:
+        if isinstance(day, str):
+            day = date.fromisoformat(day)
+        db.add(RevenueDaily(day=day, amount=amount or 0.0))
+    db.flush()
+
+def ensure_statistics():
+    """Zainicjalizuj liczniki dla bazy, która ich jeszcze nie ma"""
+    db = SessionLocal()
+    try:
+        if db.query(StatCounter).first() is None:
+            rebuild_statistics(db)
+            db.commit()
+    finally:
+        db.close()
+
+ensure_statistics()
+
+# ===== SEARCH INDEX =====
+
+def equipment_search_fields(equipment: Equipment) -> dict:
+    return {field: getattr(equipment, field) for field in SOURCE_FIELDS}
+
+def reindex_equipment(db: Session, equipment_list: List[Equipment]):
+    """Zaktualizuj indeks wyszukiwania w tej samej transakcji co zapis sprzętu"""
+    search_index.sync(db, [(equipment.id, equipment_search_fields(equipment)) for equipment in equipment_list])
+
+def rebuild_search_index(db: Session, batch_size: int = 1000):
+    search_index.clear(db)
+    last_id = 0
+    while True:
+        rows = db.query(Equipment.id, *[getattr(Equipment, field) for field in SOURCE_FIELDS]).filter(
+            Equipment.id > last_id
+        ).order_by(Equipment.id).limit(batch_size).all()
+        if not rows:
+            return
+        search_index.sync(db, [(row.id, row._mapping) for row in rows])
+        last_id = rows[-1].id
+
+def ensure_search_index():
+    """Odbuduj indeks, jeśli nie zgadza się z tabelą sprzętu (np. nowa tabela FTS)"""
+    db = SessionLocal()
+    try:
+        if search_index.count(db) != db.query(func.count(Equipment.id)).scalar():
+            rebuild_search_index(db)
+            db.commit()
+    finally:
+        db.close()
+
+ensure_search_index()
+
+# ===== EQUIPMENT ATTRIBUTES =====
+
+NUMERIC_ATTRIBUTE_COLUMNS = ("weight_kg", "power_kw", "reach_m")
+
+def equipment_numeric_attributes(weight: Optional[str], power: Optional[str], reach: Optional[str]) -> dict:
+    return {
+        "weight_kg": parse_weight_kg(weight),
+        "power_kw": parse_power_kw(power),
+        "reach_m": parse_length_m(reach),
+    }
+
+def backfill_equipment_attributes(batch_size: int = 1000) -> int:
+    """Przelicz kolumny liczbowe dla całej tabeli sprzętu - paczkami, transakcja na paczkę"""
+    table = Equipment.__table__
+    db = SessionLocal()
+    processed, last_id = 0, 0
+    try:
+        while True:
+            rows = db.query(Equipment.id, Equipment.weight, Equipment.power, Equipment.reach).filter(
+                Equipment.id > last_id
+            ).order_by(Equipment.id).limit(batch_size).all()
+            if not rows:
+                break
+            db.execute(update(table).where(table.c.id == bindparam("_id")), [
+                {"_id": row.id, **equipment_numeric_attributes(row.weight, row.power, row.reach)}
+                for row in rows
+            ])
+            db.commit()
+            processed += len(rows)
+            last_id = rows[-1].id
+    finally:
+        db.close()
+    return processed
+
+# Kolumny właśnie dodane do istniejącej bazy - uzupełnij je od razu
+if any(f"equipment.{column}" in schema_added_columns for column in NUMERIC_ATTRIBUTE_COLUMNS):
+    backfill_equipment_attributes()
+
+# ===== RESERVATION LIFECYCLE =====
+
+def refresh_equipment_status(db: Session, equipment_ids: List[int], chunk_size: int = 500) -> int:
+    """
+    Status sprzętu z rezerwacji: trwająca (active) = rented, brak = available.
+    Sprzęt w serwisie zostaje bez zmian. Zwraca liczbę zmienionych maszyn.
+    """
+    table = Equipment.__table__
+    reservations = Reservation.__table__
+    ongoing = select(reservations.c.id).where(
+        reservations.c.equipment_id == table.c.id,
+        reservations.c.status == "active"
+    ).exists()
+    changed = 0
+    for position in range(0, len(equipment_ids), chunk_size):
+        chunk = equipment_ids[position:position + chunk_size]
+        rented = db.execute(
+            update(table).where(table.c.id.in_(chunk), table.c.status == "available", ongoing)
+            .values(status="rented").returning(table.c.id)
+        ).all()
+        released = db.execute(
+            update(table).where(table.c.id.in_(chunk), table.c.status == "rented", ~ongoing)
+            .values(status="available").returning(table.c.id)
+        ).all()
+        bump_counter(db, "equipment:available", len(released) - len(rented))
+        bump_counter(db, "equipment:rented", len(rented) - len(released))
+        changed += len(rented) + len(released)
+    return changed
+
+def sweep_reservation_lifecycle(now: Optional[datetime] = None) -> int:
+    """
+    Przestaw rezerwacje według dat: pending -> active (start minął) i active ->
+    completed (koniec minął). Jedno UPDATE ... RETURNING na przejście, liczniki
+    jako delty, potem przeliczenie statusu tylko dotkniętego sprzętu.
+    """
+    now = now or datetime.now()
+    table = Reservation.__table__
+    db = SessionLocal()
+    try:
+        activated = db.execute(
+            update(table).where(table.c.status == "pending", table.c.start_date <= now)
+            .values(status="active")
+            .returning(table.c.id, table.c.equipment_id, table.c.created_at, table.c.total_cost)
+        ).all()
+        # W tej samej transakcji - zaległa rezerwacja pending przejdzie od razu do completed
+        completed = db.execute(
+            update(table).where(table.c.status == "active", table.c.end_date < now)
+            .values(status="completed")
+            .returning(table.c.id, table.c.equipment_id)
+        ).all()
+        if not activated and not completed:
+            db.rollback()
+            return 0
+        
+        bump_counter(db, "reservations:pending", -len(activated))
+        bump_counter(db, "reservations:active", len(activated) - len(completed))
+        bump_counter(db, "reservations:completed", len(completed))
+        revenue = {}
+        for row in activated:
+            day = row.created_at.date()
+            revenue[day] = revenue.get(day, 0.0) + (row.total_cost or 0.0)
+        for day, amount in revenue.items():
+            add_revenue(db, day, amount)
+        
+        equipment_ids = sorted({row.equipment_id for row in activated} | {row.equipment_id for row in completed})
+        changed_equipment = refresh_equipment_status(db, equipment_ids)
+        db.commit()
+    finally:
+        db.close()
+    
+    catalog_cache.bump()
+    event_hub.publish("lifecycle", {"activated": len(activated), "completed": len(completed), "equipment_changed": changed_equipment})
+    metrics.reservation_transitions_total.inc("pending_active", amount=len(activated))
+    metrics.reservation_transitions_total.inc("active_completed", amount=len(completed))
+    return len(activated) + len(completed) + changed_equipment
+
+def invalidate_reservation_caches():
+    """Inny worker (lider schedulera) zmienił statusy - przeładuj dane z bazy"""
+    # Lider podbił już wspólną wersję katalogu - wystarczy ją odczytać
+    catalog_cache.sync()
+    event_hub.publish("lifecycle", {})
+
+# Jeden lider na wszystkie workery (dzierżawa w tabeli scheduler_leases)
+lifecycle_job = PeriodicJob(
+    LeaderLease(SessionLocal, SchedulerLease, "reservation-lifecycle"),
+    sweep_reservation_lifecycle,
+    on_remote_change=invalidate_reservation_caches
+)
+
+# ===== PAGINATION =====
+
+def encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"id": last_id}).encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(padded))["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Nieprawidłowy kursor")
+
+def parse_fields(fields: Optional[str], allowed) -> Optional[List[str]]:
+    """Parsuj parametr fields= (lista pól oddzielonych przecinkami)"""
+    if not fields:
+        return None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Nieznane pola: {', '.join(unknown)}")
+    # id zawsze w odpowiedzi - potrzebne do kursora
+    return ["id"] + [field for field in dict.fromkeys(requested) if field != "id"]
+
+def pagination_headers(request: Request, next_cursor: Optional[str]) -> dict:
+    if not next_cursor:
+        return {}
+    next_url = request.url.include_query_params(cursor=next_cursor)
+    return {"X-Next-Cursor": next_cursor, "Link": f'<{next_url}>; rel="next"'}
+
+def paginate(query, id_column, cursor: Optional[str], limit: int, descending: bool = False):
+    """Pobierz jedną stronę wyników (keyset po id) i kursor następnej strony"""
+    after_id = decode_cursor(cursor)
+    if after_id is not None:
+        query = query.filter(id_column < after_id if descending else id_column > after_id)
+    rows = query.order_by(id_column.desc() if descending else id_column).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].id)
+    return rows, next_cursor
+
 # ===== API ENDPOINTS =====
 
 @app.get("/")
@@ -322,10 +1238,15 @@ async def health_check():
         "database": "connected"
     }
 
+# Metryki w formacie Prometheusa
+@app.get("/metrics")
+async def metrics_endpoint():
+    return Response(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
 # ===== AUTH ENDPOINTS =====
 
 @app.post("/api/auth/register", response_model=UserResponse)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+def register(user_data: UserCreate, db: Session = Depends(get_db)):
     # Check if user exists
     db_user = db.query(User).filter(User.email == user_data.email).first()
     if db_user:
@@ -344,13 +1265,14 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     )
     
     db.add(db_user)
+    bump_counter(db, "customers:total")
     db.commit()
     db.refresh(db_user)
     
     return db_user
 
 @app.post("/api/auth/login", response_model=Token)
-async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
+def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
     user = db.query(User).filter(User.email == user_credentials.email).first()
     
     if not user or not verify_password(user_credentials.password, user.hashed_password):
@@ -359,7 +1281,13 @@ async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
     if not user.is_active:
         raise HTTPException(status_code=401, detail="Konto zostało dezaktywowane")
     
-    access_token = create_access_token(data={"sub": user.email})
+    # Przehashuj hasło, jeśli zmienił się skonfigurowany koszt bcrypt
+    if password_hasher.needs_rehash(user.hashed_password):
+        user.hashed_password = hash_password(user_credentials.password)
+        db.commit()
+        db.refresh(user)
+    
+    access_token = create_access_token(data={"sub": user.email, "uid": user.id})
     
     return {
         "access_token": access_token,
@@ -368,11 +1296,11 @@ async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
     }
 
 @app.get("/api/auth/me", response_model=UserResponse)
-async def get_current_user_info(current_user: User = Depends(get_current_user)):
+async def get_current_user_info(current_user: Principal = Depends(get_current_user)):
     return current_user
 
 @app.post("/api/auth/google", response_model=Token)
-async def google_login(google_data: GoogleLoginRequest, db: Session = Depends(get_db)):
+def google_login(google_data: GoogleLoginRequest, db: Session = Depends(get_db)):
     try:
         # Weryfikuj Google token
         # UWAGA: Zamień na swój prawdziwy Google Client ID
@@ -408,11 +1336,12 @@ async def google_login(google_data: GoogleLoginRequest, db: Session = Depends(ge
                 is_active=True
             )
             db.add(user)
+            bump_counter(db, "customers:total")
             db.commit()
             db.refresh(user)
         
         # Utwórz JWT token
-        access_token = create_access_token(data={"sub": user.email})
+        access_token = create_access_token(data={"sub": user.email, "uid": user.id})
         
         return {
             "access_token": access_token,
@@ -426,17 +1355,100 @@ async def google_login(google_data: GoogleLoginRequest, db: Session = Depends(ge
     except Exception as e:
         # Inny błąd
         raise HTTPException(status_code=500, detail=f"Błąd serwera: {str(e)}")
+# ===== USER MANAGEMENT ENDPOINTS =====
+
+@app.put("/api/users/{user_id}", response_model=UserResponse)
+def update_user(
+    user_id: int,
+    user_data: UserAdminUpdate,
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Dezaktywacja / nadanie uprawnień administratora"""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Brak uprawnień")
+    
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="Użytkownik nie został znaleziony")
+    
+    for field, value in user_data.dict(exclude_unset=True).items():
+        setattr(user, field, value)
+    user_email = user.email
+    
+    db.commit()
+    
+    # Zmienione uprawnienia muszą obowiązywać od następnego requestu - także
+    # na innych workerach (przed refresh: sesja nie trzyma wtedy połączenia)
+    principal_cache.invalidate(user_email)
+    db.refresh(user)
+    
+    return user
+
 # ===== EQUIPMENT ENDPOINTS =====
 
 @app.get("/api/equipment", response_model=List[EquipmentResponse])
-async def get_equipment(
+def get_equipment(
+    request: Request,
     category: Optional[str] = None,
     status: Optional[str] = None,
     available_only: bool = False,
+    min_weight_kg: Optional[float] = None,
+    max_weight_kg: Optional[float] = None,
+    min_power_kw: Optional[float] = None,
+    max_power_kw: Optional[float] = None,
+    min_reach_m: Optional[float] = None,
+    max_reach_m: Optional[float] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
     db: Session = Depends(get_db)
+):
+    selected_fields = parse_fields(fields, EquipmentResponse.model_fields)
+    ranges = (
+        ("weight_kg", min_weight_kg, max_weight_kg),
+        ("power_kw", min_power_kw, max_power_kw),
+        ("reach_m", min_reach_m, max_reach_m),
+    )
+    
+    cache_key = (category, status, available_only, ranges, cursor, limit, tuple(selected_fields or ()))
+    cached = catalog_cache.get(cache_key)
+    if cached is None:
+        version = catalog_cache.version
+        equipment_list, next_cursor = list_equipment(db, category, status, available_only, cursor, limit, selected_fields, ranges)
+        if selected_fields:
+            body = json.dumps(
+                jsonable_encoder([equipment_fields_dict(equipment, selected_fields) for equipment in equipment_list]),
+                ensure_ascii=False,
+                separators=(",", ":")
+            ).encode("utf-8")
+        else:
+            body = b"[" + b",".join(render_equipment(equipment)[1] for equipment in equipment_list) + b"]"
+        cached = catalog_cache.store(cache_key, version, body, next_cursor)
+    
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache", **pagination_headers(request, cached.next_cursor)}
+    if etag_matches(request.headers.get("If-None-Match"), cached.etag):
+        return Response(status_code=304, headers=headers)
+    
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+def list_equipment(
+    db: Session,
+    category: Optional[str],
+    status: Optional[str],
+    available_only: bool,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    fields: Optional[List[str]] = None,
+    ranges: tuple = ()
 ):
     query = db.query(Equipment)
     
+    if fields:
+        # Pobierz tylko kolumny potrzebne do wybranych pól
+        columns = {"status" if field == "available" else field for field in fields}
+        query = query.options(load_only(*[getattr(Equipment, column) for column in columns]))
+    
     if category and category != "Wszystkie":
         query = query.filter(Equipment.category == category)
     
@@ -446,63 +1458,152 @@ async def get_equipment(
     if available_only:
         query = query.filter(Equipment.status == "available")
     
-    equipment_list = query.all()
+    # Zakresy parametrów (kg, kW, m); sprzęt bez wartości nie spełnia filtra
+    for column_name, minimum, maximum in ranges:
+        column = getattr(Equipment, column_name)
+        if minimum is not None:
+            query = query.filter(column >= minimum)
+        if maximum is not None:
+            query = query.filter(column <= maximum)
+    
+    return paginate(query, Equipment.id, cursor, limit)
+
+# Maksymalny zakres kalendarza dostępności (w dniach)
+AVAILABILITY_MAX_DAYS = 366
+
+@app.get("/api/equipment/availability", response_model=List[EquipmentAvailability])
+def get_equipment_availability(
+    date_from: date = Query(..., alias="from"),
+    date_to: date = Query(..., alias="to"),
+    category: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Kalendarz wolnych/zajętych okien dla całej floty w podanym zakresie dat"""
+    if date_to < date_from:
+        raise HTTPException(status_code=400, detail="Data końcowa musi być późniejsza niż początkowa")
+    
+    if (date_to - date_from).days + 1 > AVAILABILITY_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Maksymalny zakres to {AVAILABILITY_MAX_DAYS} dni")
+    
+    window_start = datetime.combine(date_from, datetime.min.time())
+    window_end = datetime.combine(date_to, datetime.max.time())
+    
+    # Jedno zapytanie: sprzęt + nakładające się rezerwacje (LEFT JOIN)
+    query = db.query(
+        Equipment.id,
+        Equipment.name,
+        Equipment.category,
+        Equipment.status,
+        Reservation.start_date,
+        Reservation.end_date
+    ).outerjoin(
+        Reservation,
+        (Reservation.equipment_id == Equipment.id)
+        & Reservation.status.in_(BLOCKING_STATUSES)
+        & (Reservation.start_date <= window_end)
+        & (Reservation.end_date >= window_start)
+    )
+    
+    if category and category != "Wszystkie":
+        query = query.filter(Equipment.category == category)
+    
+    rows = query.order_by(Equipment.id, Reservation.start_date).all()
     
-    # Process response
     result = []
-    for equipment in equipment_list:
-        equipment_dict = {
-            "id": equipment.id,
-            "name": equipment.name,
-            "category": equipment.category,
-            "daily_rate": equipment.daily_rate,
-            "status": equipment.status,
-            "description": equipment.description,
-            "weight": equipment.weight,
-            "fuel_type": equipment.fuel_type,
-            "power": equipment.power,
-            "reach": equipment.reach,
-            "image_url": equipment.image_url,
-            "features": deserialize_features(equipment.features),
-            "specifications": deserialize_specifications(equipment.specifications),
-            "available": equipment.status == "available",
-            "created_at": equipment.created_at
-        }
-        result.append(EquipmentResponse(**equipment_dict))
+    current = None
+    busy_ranges = []
+    
+    def flush():
+        if current is None:
+            return
+        if current["status"] == "maintenance":
+            # Sprzęt w serwisie jest zajęty przez cały okres
+            busy, free = [(date_from, date_to)], []
+        else:
+            busy, free = compute_windows(busy_ranges, date_from, date_to)
+        current["busy"] = [AvailabilityWindow(start=start, end=end) for start, end in busy]
+        current["free"] = [AvailabilityWindow(start=start, end=end) for start, end in free]
+        result.append(EquipmentAvailability(**current))
+    
+    for equipment_id, name, equipment_category, equipment_status, start_date, end_date in rows:
+        if current is None or current["equipment_id"] != equipment_id:
+            flush()
+            current = {
+                "equipment_id": equipment_id,
+                "name": name,
+                "category": equipment_category,
+                "status": equipment_status
+            }
+            busy_ranges = []
+        if start_date is not None:
+            busy_ranges.append((start_date.date(), end_date.date()))
+    
+    flush()
     
     return result
 
+@app.get("/api/equipment/search", response_model=EquipmentSearchResponse)
+def search_equipment(
+    q: str = Query(..., min_length=1, max_length=200),
+    category: Optional[str] = None,
+    fuel_type: Optional[str] = None,
+    available_only: bool = False,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db)
+):
+    """
+    Wyszukiwanie pełnotekstowe (nazwa, opis, cechy, specyfikacja) z rankingiem.
+    Fasety liczone są dla całego wyniku - bez filtra własnego wymiaru,
+    żeby pokazywały, ile dałoby przełączenie kategorii/paliwa.
+    """
+    tokens = query_tokens(q)
+    if not tokens:
+        return EquipmentSearchResponse(query=q, total=0, items=[], facets={"category": {}, "fuel_type": {}})
+    
+    matches = search_index.matches(tokens)
+    filters = {
+        "category": Equipment.category == category if category else None,
+        "fuel_type": Equipment.fuel_type == fuel_type if fuel_type else None,
+        "status": Equipment.status == "available" if available_only else None,
+    }
+    
+    def matched(query, skip: Optional[str] = None):
+        query = query.join(matches, Equipment.id == matches.c.equipment_id)
+        for name, condition in filters.items():
+            if condition is not None and name != skip:
+                query = query.filter(condition)
+        return query
+    
+    results = matched(db.query(Equipment, matches.c.rank))
+    total = results.count()
+    rows = results.order_by(matches.c.rank, Equipment.id).offset(offset).limit(limit).all()
+    
+    facets = {}
+    for dimension in ("category", "fuel_type"):
+        column = getattr(Equipment, dimension)
+        counts = matched(db.query(column, func.count(Equipment.id)), skip=dimension).group_by(column).all()
+        facets[dimension] = {value: count for value, count in sorted(counts, key=lambda item: (-item[1], item[0] or ""))}
+    
+    items = [
+        EquipmentSearchHit(**equipment_to_response(equipment).model_dump(), score=round(-rank, 4))
+        for equipment, rank in rows
+    ]
+    return EquipmentSearchResponse(query=q, total=total, items=items, facets=facets)
+
 @app.get("/api/equipment/{equipment_id}", response_model=EquipmentResponse)
-async def get_equipment_by_id(equipment_id: int, db: Session = Depends(get_db)):
+def get_equipment_by_id(equipment_id: int, db: Session = Depends(get_db)):
     equipment = db.query(Equipment).filter(Equipment.id == equipment_id).first()
     
     if not equipment:
         raise HTTPException(status_code=404, detail="Sprzęt nie został znaleziony")
     
-    equipment_dict = {
-        "id": equipment.id,
-        "name": equipment.name,
-        "category": equipment.category,
-        "daily_rate": equipment.daily_rate,
-        "status": equipment.status,
-        "description": equipment.description,
-        "weight": equipment.weight,
-        "fuel_type": equipment.fuel_type,
-        "power": equipment.power,
-        "reach": equipment.reach,
-        "image_url": equipment.image_url,
-        "features": deserialize_features(equipment.features),
-        "specifications": deserialize_specifications(equipment.specifications),
-        "available": equipment.status == "available",
-        "created_at": equipment.created_at
-    }
-    
-    return EquipmentResponse(**equipment_dict)
+    return equipment_to_response(equipment)
 
 @app.post("/api/equipment", response_model=EquipmentResponse)
-async def create_equipment(
+def create_equipment(
     equipment_data: EquipmentCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     if not current_user.is_admin:
@@ -519,38 +1620,133 @@ async def create_equipment(
         reach=equipment_data.reach,
         image_url=equipment_data.image_url,
         features=serialize_features(equipment_data.features),
-        specifications=serialize_specifications(equipment_data.specifications)
+        specifications=serialize_specifications(equipment_data.specifications),
+        **equipment_numeric_attributes(equipment_data.weight, equipment_data.power, equipment_data.reach)
     )
     
     db.add(db_equipment)
+    db.flush()
+    reindex_equipment(db, [db_equipment])
+    bump_counter(db, "equipment:total")
+    track_equipment_status(db, None, "available")
     db.commit()
+    # Podbicie wersji przed refresh - sesja żądania nie trzyma wtedy połączenia
+    catalog_cache.bump()
     db.refresh(db_equipment)
+    publish_equipment_event("created", db_equipment)
+    
+    return equipment_to_response(db_equipment)
+
+def import_equipment_chunk(db: Session, rows: List[tuple], report: ImportReport):
+    """
+    Zapisz paczkę zwalidowanych wierszy (numer, EquipmentImportRow) w jednej
+    transakcji: nowe przez INSERT executemany, istniejące przez UPDATE executemany.
+    """
+    table = Equipment.__table__
+    ids = [row.id for _, row in rows if row.id is not None]
+    existing = dict(db.query(Equipment.id, Equipment.status).filter(Equipment.id.in_(ids)).all()) if ids else {}
+    
+    inserts, updates = [], []
+    status_deltas = {}
+    for number, row in rows:
+        values = {
+            "name": row.name,
+            "category": row.category,
+            "daily_rate": row.daily_rate,
+            "description": row.description,
+            "weight": row.weight,
+            "fuel_type": row.fuel_type,
+            "power": row.power,
+            "reach": row.reach,
+            "image_url": row.image_url,
+            "features": serialize_features(row.features),
+            "specifications": serialize_specifications(row.specifications),
+            **equipment_numeric_attributes(row.weight, row.power, row.reach),
+        }
+        if row.id is None:
+            values["status"] = row.status or "available"
+            inserts.append(values)
+            status_deltas[values["status"]] = status_deltas.get(values["status"], 0) + 1
+        elif row.id in existing:
+            old_status = existing[row.id]
+            values["status"] = row.status or old_status
+            values["_id"] = row.id
+            updates.append(values)
+            if values["status"] != old_status:
+                status_deltas[old_status] = status_deltas.get(old_status, 0) - 1
+                status_deltas[values["status"]] = status_deltas.get(values["status"], 0) + 1
+        else:
+            report.fail(number, f"Sprzęt o id {row.id} nie istnieje")
+    
+    indexed = [(values["_id"], values) for values in updates]
+    if inserts:
+        inserted_ids = db.execute(insert(table).returning(table.c.id, sort_by_parameter_order=True), inserts).scalars().all()
+        indexed.extend(zip(inserted_ids, inserts))
+    if updates:
+        db.execute(update(table).where(table.c.id == bindparam("_id")), updates)
+    search_index.sync(db, indexed)
+    bump_counter(db, "equipment:total", len(inserts))
+    for equipment_status, delta in status_deltas.items():
+        bump_counter(db, f"equipment:{equipment_status}", delta)
+    db.commit()
     
-    equipment_dict = {
-        "id": db_equipment.id,
-        "name": db_equipment.name,
-        "category": db_equipment.category,
-        "daily_rate": db_equipment.daily_rate,
-        "status": db_equipment.status,
-        "description": db_equipment.description,
-        "weight": db_equipment.weight,
-        "fuel_type": db_equipment.fuel_type,
-        "power": db_equipment.power,
-        "reach": db_equipment.reach,
-        "image_url": db_equipment.image_url,
-        "features": deserialize_features(db_equipment.features),
-        "specifications": deserialize_specifications(db_equipment.specifications),
-        "available": db_equipment.status == "available",
-        "created_at": db_equipment.created_at
-    }
+    report.inserted += len(inserts)
+    report.updated += len(updates)
+
+@app.post("/api/equipment/bulk")
+def bulk_import_equipment(
+    request: Request,
+    requested_format: Optional[str] = Query(None, alias="format"),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Import sprzętu z CSV (text/csv) albo NDJSON (application/x-ndjson), czytany
+    strumieniowo. Każda paczka BULK_CHUNK_SIZE wierszy to osobna transakcja -
+    zapisane paczki zostają nawet, jeśli dalsza część pliku jest uszkodzona.
+    """
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Brak uprawnień")
+    
+    try:
+        file_format = detect_format(request.headers.get("content-type"), requested_format)
+    except ImportFormatError as error:
+        raise HTTPException(status_code=415, detail=str(error))
     
-    return EquipmentResponse(**equipment_dict)
+    report = ImportReport()
+    try:
+        for chunk in batched(iter_rows(iter_request_body(request), file_format), BULK_CHUNK_SIZE):
+            valid_rows = []
+            for parsed in chunk:
+                if parsed.error:
+                    report.fail(parsed.number, parsed.error)
+                    continue
+                try:
+                    valid_rows.append((parsed.number, EquipmentImportRow(**parsed.data)))
+                except ValidationError as error:
+                    report.fail(parsed.number, validation_message(error))
+            if not valid_rows:
+                continue
+            try:
+                import_equipment_chunk(db, valid_rows, report)
+            except SQLAlchemyError as error:
+                db.rollback()
+                for number, _ in valid_rows:
+                    report.fail(number, f"Błąd zapisu paczki: {error.__class__.__name__}")
+            catalog_cache.bump()
+    except ImportFormatError as error:
+        publish_import_event(report)
+        return JSONResponse(status_code=400, content={"detail": str(error), **report.as_dict()})
+    
+    publish_import_event(report)
+    return report.as_dict()
+
 
 @app.put("/api/equipment/{equipment_id}", response_model=EquipmentResponse)
-async def update_equipment(
+def update_equipment(
     equipment_id: int,
     equipment_data: EquipmentUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     if not current_user.is_admin:
@@ -567,95 +1763,75 @@ async def update_equipment(
     if 'specifications' in update_data:
         update_data['specifications'] = serialize_specifications(update_data['specifications'])
     
+    if 'status' in update_data:
+        track_equipment_status(db, equipment.status, update_data['status'])
+    
+    if update_data.keys() & {'weight', 'power', 'reach'}:
+        update_data.update(equipment_numeric_attributes(
+            update_data.get('weight', equipment.weight),
+            update_data.get('power', equipment.power),
+            update_data.get('reach', equipment.reach)
+        ))
+    
     for field, value in update_data.items():
         setattr(equipment, field, value)
     
+    if update_data.keys() & set(SOURCE_FIELDS):
+        reindex_equipment(db, [equipment])
     db.commit()
+    catalog_cache.bump()
     db.refresh(equipment)
+    publish_equipment_event("updated", equipment)
     
-    equipment_dict = {
-        "id": equipment.id,
-        "name": equipment.name,
-        "category": equipment.category,
-        "daily_rate": equipment.daily_rate,
-        "status": equipment.status,
-        "description": equipment.description,
-        "weight": equipment.weight,
-        "fuel_type": equipment.fuel_type,
-        "power": equipment.power,
-        "reach": equipment.reach,
-        "image_url": equipment.image_url,
-        "features": deserialize_features(equipment.features),
-        "specifications": deserialize_specifications(equipment.specifications),
-        "available": equipment.status == "available",
-        "created_at": equipment.created_at
-    }
-    
-    return EquipmentResponse(**equipment_dict)
+    return equipment_to_response(equipment)
 
 # ===== RESERVATION ENDPOINTS =====
 
 @app.post("/api/reservations", response_model=ReservationResponse)
-async def create_reservation(
+def create_reservation(
     reservation_data: ReservationCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
+    reservation_id, = book_equipment(db, current_user.id, [reservation_data])
     
-    # Check if equipment exists and is available
-    equipment = db.query(Equipment).filter(Equipment.id == reservation_data.equipment_id).first()
-    if not equipment:
-        raise HTTPException(status_code=404, detail="Sprzęt nie został znaleziony")
-    
-    if equipment.status != "available":
-        raise HTTPException(status_code=400, detail="Sprzęt nie jest dostępny")
-    
-    # Check for conflicting reservations
-    start_datetime = datetime.combine(reservation_data.start_date, datetime.min.time())
-    end_datetime = datetime.combine(reservation_data.end_date, datetime.max.time())
-    
-    existing_reservation = db.query(Reservation).filter(
-        Reservation.equipment_id == reservation_data.equipment_id,
-        Reservation.status.in_(["pending", "active"]),
-        Reservation.start_date <= end_datetime,
-        Reservation.end_date >= start_datetime
-    ).first()
-    
-    if existing_reservation:
-        raise HTTPException(status_code=400, detail="Sprzęt jest już zarezerwowany w tym okresie")
-    
-    # Calculate total cost
-    days = (reservation_data.end_date - reservation_data.start_date).days + 1
-    total_cost = days * equipment.daily_rate
-    
-    # Create reservation
-    db_reservation = Reservation(
-        equipment_id=reservation_data.equipment_id,
-        customer_id=current_user.id,
-        start_date=start_datetime,
-        end_date=end_datetime,
-        total_cost=total_cost,
-        contract_number=generate_contract_number(),
-        notes=reservation_data.notes
-    )
-    
-    db.add(db_reservation)
-    
-    # Update equipment status
-    equipment.status = "rented"
-    
-    db.commit()
-    db.refresh(db_reservation)
+    # Jedno zapytanie zamiast refresh + leniwego ładowania sprzętu i klienta
+    db_reservation = reservation_query(db).populate_existing().filter(Reservation.id == reservation_id).one()
+    return reservation_to_response(db_reservation)
+
+@app.post("/api/reservations/batch", response_model=List[ReservationResponse])
+def create_reservation_batch(
+    batch_data: ReservationBatchCreate,
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Rezerwacja kilku maszyn na jedno zlecenie - wszystkie albo żadna"""
+    reservation_ids = book_equipment(db, current_user.id, batch_data.items, batch_data.notes, batch_data.promo_code)
     
-    return db_reservation
+    reservations = reservation_query(db).populate_existing().filter(Reservation.id.in_(reservation_ids)).order_by(Reservation.id).all()
+    return [reservation_to_response(reservation) for reservation in reservations]
 
 @app.get("/api/reservations", response_model=List[ReservationResponse])
-async def get_reservations(
+def get_reservations(
+    request: Request,
+    response: Response,
     status: Optional[str] = None,
-    current_user: User = Depends(get_current_user),
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    order: str = Query("asc", pattern="^(asc|desc)$"),  # desc = najnowsze najpierw
+    fields: Optional[str] = None,
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    query = db.query(Reservation)
+    selected_fields = parse_fields(fields, ReservationResponse.model_fields)
+    
+    if selected_fields:
+        query = reservation_query(db, "equipment" in selected_fields, "customer" in selected_fields)
+        # Pobierz tylko kolumny potrzebne do wybranych pól
+        columns = [field for field in selected_fields if field not in ("equipment", "customer")]
+        query = query.options(load_only(*[getattr(Reservation, column) for column in columns]))
+    else:
+        query = reservation_query(db)
     
     if not current_user.is_admin:
         # Regular users can only see their own reservations
@@ -664,16 +1840,34 @@ async def get_reservations(
     if status:
         query = query.filter(Reservation.status == status)
     
-    reservations = query.all()
-    return reservations
+    # Kursor strony z order=desc wskazuje w dół - link "next" zachowuje order
+    reservations, next_cursor = paginate(query, Reservation.id, cursor, limit, descending=order == "desc")
+    headers = pagination_headers(request, next_cursor)
+    
+    if selected_fields:
+        content = []
+        for reservation in reservations:
+            item = {}
+            for field in selected_fields:
+                if field == "equipment":
+                    item[field] = equipment_to_response(reservation.equipment)
+                elif field == "customer":
+                    item[field] = UserResponse.model_validate(reservation.customer)
+                else:
+                    item[field] = getattr(reservation, field)
+            content.append(item)
+        return JSONResponse(content=jsonable_encoder(content), headers=headers)
+    
+    response.headers.update(headers)
+    return [reservation_to_response(reservation) for reservation in reservations]
 
 @app.get("/api/reservations/{reservation_id}", response_model=ReservationResponse)
-async def get_reservation(
+def get_reservation(
     reservation_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    reservation = db.query(Reservation).filter(Reservation.id == reservation_id).first()
+    reservation = reservation_query(db).filter(Reservation.id == reservation_id).first()
     
     if not reservation:
         raise HTTPException(status_code=404, detail="Rezerwacja nie została znaleziona")
@@ -681,13 +1875,13 @@ async def get_reservation(
     if not current_user.is_admin and reservation.customer_id != current_user.id:
         raise HTTPException(status_code=403, detail="Brak uprawnień")
     
-    return reservation
+    return reservation_to_response(reservation)
 
 @app.put("/api/reservations/{reservation_id}/status")
-async def update_reservation_status(
+def update_reservation_status(
     reservation_id: int,
     status: str,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     if not current_user.is_admin:
@@ -699,75 +1893,206 @@ async def update_reservation_status(
     
     old_status = reservation.status
     reservation.status = status
+    track_reservation_status(db, reservation, old_status, status)
     
     # Update equipment status based on reservation status
     equipment = db.query(Equipment).filter(Equipment.id == reservation.equipment_id).first()
+    old_equipment_status = equipment.status
     if status == "completed" or status == "cancelled":
         equipment.status = "available"
     elif status == "active":
         equipment.status = "rented"
+    track_equipment_status(db, old_equipment_status, equipment.status)
+    # Odczyt przed commitem - po nim atrybuty wygasają i każdy to dodatkowy SELECT
+    equipment_id, start_date, end_date, equipment_status = reservation.equipment_id, reservation.start_date, reservation.end_date, equipment.status
     
     db.commit()
+    catalog_cache.bump()
+    publish_reservation_event("updated", reservation_id, equipment_id, status, start_date, end_date, equipment_status)
     
     return {"message": f"Status rezerwacji zmieniony z {old_status} na {status}"}
 
-# ===== STATISTICS ENDPOINTS =====
+# ===== PRICING ENDPOINTS =====
 
-@app.get("/api/statistics")
-async def get_statistics(
-    current_user: User = Depends(get_current_user),
+@app.post("/api/quotes", response_model=QuoteResponse)
+def create_quote(quote_data: QuoteRequest, db: Session = Depends(get_db)):
+    """Wycena koszyka (do 500 linii) tym samym silnikiem, którego używa rezerwacja"""
+    equipment_ids = {item.equipment_id for item in quote_data.items}
+    equipment_by_id = {
+        row.id: row for row in db.query(Equipment.id, Equipment.name, Equipment.category, Equipment.daily_rate).filter(
+            Equipment.id.in_(equipment_ids)
+        )
+    }
+    missing = sorted(equipment_ids - equipment_by_id.keys())
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Sprzęt nie został znaleziony: {', '.join(map(str, missing))}")
+    
+    rules = pricing_engine.rules(db)
+    lines = []
+    for item in quote_data.items:
+        equipment = equipment_by_id[item.equipment_id]
+        try:
+            price = rules.price(equipment.daily_rate, equipment.category, item.start_date, item.end_date, quote_data.promo_code)
+        except PricingError as error:
+            raise HTTPException(status_code=400, detail=f"{error} (sprzęt #{item.equipment_id})")
+        lines.append(QuoteLineResponse(
+            equipment_id=equipment.id,
+            equipment_name=equipment.name,
+            category=equipment.category,
+            start_date=item.start_date,
+            end_date=item.end_date,
+            days=price.days,
+            weekend_days=price.weekend_days,
+            daily_rate=equipment.daily_rate,
+            base_amount=price.base_amount,
+            tier_discount_percent=price.tier_discount_percent,
+            promotion=price.promotion.name if price.promotion else None,
+            promotion_discount_percent=price.promotion.discount_percent if price.promotion else 0.0,
+            total=price.total
+        ))
+    
+    return QuoteResponse(
+        lines=lines,
+        base_amount=round(sum(line.base_amount for line in lines), 2),
+        total=round(sum(line.total for line in lines), 2)
+    )
+
+@app.get("/api/promotions", response_model=List[PromotionResponse])
+def get_promotions(db: Session = Depends(get_db)):
+    """Promocje aktywne dziś (strona promocje)"""
+    today = date.today()
+    return db.query(Promotion).filter(
+        Promotion.is_active.is_(True),
+        Promotion.valid_from.is_(None) | (Promotion.valid_from <= today),
+        Promotion.valid_until.is_(None) | (Promotion.valid_until >= today)
+    ).order_by(Promotion.discount_percent.desc()).all()
+
+@app.post("/api/promotions", response_model=PromotionResponse)
+def create_promotion(
+    promotion_data: PromotionCreate,
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Brak uprawnień")
     
-    total_equipment = db.query(Equipment).count()
-    available_equipment = db.query(Equipment).filter(Equipment.status == "available").count()
-    rented_equipment = db.query(Equipment).filter(Equipment.status == "rented").count()
-    maintenance_equipment = db.query(Equipment).filter(Equipment.status == "maintenance").count()
+    if promotion_data.code and db.query(Promotion.id).filter(Promotion.code == promotion_data.code).first():
+        raise HTTPException(status_code=400, detail="Promocja z tym kodem już istnieje")
     
-    total_reservations = db.query(Reservation).count()
-    active_reservations = db.query(Reservation).filter(Reservation.status == "active").count()
-    pending_reservations = db.query(Reservation).filter(Reservation.status == "pending").count()
-    completed_reservations = db.query(Reservation).filter(Reservation.status == "completed").count()
+    promotion = Promotion(**promotion_data.dict())
+    db.add(promotion)
+    db.commit()
+    db.refresh(promotion)
+    pricing_engine.invalidate()
     
-    total_customers = db.query(User).count()
+    return promotion
+
+@app.put("/api/promotions/{promotion_id}", response_model=PromotionResponse)
+def update_promotion(
+    promotion_id: int,
+    promotion_data: PromotionUpdate,
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Brak uprawnień")
     
-    # Revenue calculation (last 30 days)
-    thirty_days_ago = datetime.now() - timedelta(days=30)
-    recent_revenue = db.query(Reservation).filter(
-        Reservation.created_at >= thirty_days_ago,
-        Reservation.status.in_(["active", "completed"])
-    ).all()
+    promotion = db.query(Promotion).filter(Promotion.id == promotion_id).first()
+    if not promotion:
+        raise HTTPException(status_code=404, detail="Promocja nie została znaleziona")
+    
+    for field, value in promotion_data.dict(exclude_unset=True).items():
+        setattr(promotion, field, value)
+    
+    db.commit()
+    db.refresh(promotion)
+    pricing_engine.invalidate()
     
-    monthly_revenue = sum(r.total_cost for r in recent_revenue)
+    return promotion
+
+@app.delete("/api/promotions/{promotion_id}")
+def delete_promotion(
+    promotion_id: int,
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Brak uprawnień")
+    
+    promotion = db.query(Promotion).filter(Promotion.id == promotion_id).first()
+    if not promotion:
+        raise HTTPException(status_code=404, detail="Promocja nie została znaleziona")
+    
+    db.delete(promotion)
+    db.commit()
+    pricing_engine.invalidate()
+    
+    return {"message": "Promocja została usunięta"}
+
+# ===== STATISTICS ENDPOINTS =====
+
+@app.get("/api/statistics")
+def get_statistics(
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Brak uprawnień")
+    
+    # Liczniki utrzymywane przez ścieżki zapisu - jedno zapytanie
+    counters = read_counters(db)
+    
+    # Revenue calculation (last 30 days) - suma z dziennego rollupu
+    thirty_days_ago = datetime.now() - timedelta(days=30)
+    monthly_revenue = db.query(func.coalesce(func.sum(RevenueDaily.amount), 0.0)).filter(
+        RevenueDaily.day >= thirty_days_ago.date()
+    ).scalar()
     
     return {
         "equipment": {
-            "total": total_equipment,
-            "available": available_equipment,
-            "rented": rented_equipment,
-            "maintenance": maintenance_equipment
+            "total": counters.get("equipment:total", 0),
+            "available": counters.get("equipment:available", 0),
+            "rented": counters.get("equipment:rented", 0),
+            "maintenance": counters.get("equipment:maintenance", 0)
         },
         "reservations": {
-            "total": total_reservations,
-            "active": active_reservations,
-            "pending": pending_reservations,
-            "completed": completed_reservations
+            "total": counters.get("reservations:total", 0),
+            "active": counters.get("reservations:active", 0),
+            "pending": counters.get("reservations:pending", 0),
+            "completed": counters.get("reservations:completed", 0)
         },
         "customers": {
-            "total": total_customers
+            "total": counters.get("customers:total", 0)
         },
         "revenue": {
-            "monthly": monthly_revenue,
+            # Suma zmiennoprzecinkowych delt - zaokrąglij jak przy przebudowie
+            "monthly": round(monthly_revenue, 2),
             "currency": "PLN"
         }
     }
 
+# ===== EVENT STREAM =====
+
+@app.get("/api/events")
+async def event_stream(request: Request):
+    """
+    Strumień SSE ze zmianami sprzętu i rezerwacji (zdarzenia equipment,
+    reservation, lifecycle). Po `reset` albo `evicted` klient pobiera stan od nowa.
+    """
+    try:
+        subscriber = event_hub.subscribe(request.headers.get("last-event-id"))
+    except HubFull:
+        raise HTTPException(status_code=503, detail="Zbyt wiele otwartych strumieni zdarzeń")
+    return StreamingResponse(
+        event_hub.stream(subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # ===== SEED DATA =====
 
 @app.post("/api/seed-data")
-async def seed_data(db: Session = Depends(get_db)):
+def seed_data(db: Session = Depends(get_db)):
     """Endpoint do wypełnienia bazy danych przykładowymi danymi"""
     
     # Check if data already exists
@@ -816,7 +2141,10 @@ async def seed_data(db: Session = Depends(get_db)):
     ]
     
     for equipment_data in sample_equipment:
-        equipment = Equipment(**equipment_data)
+        equipment = Equipment(
+            **equipment_data,
+            **equipment_numeric_attributes(equipment_data["weight"], equipment_data["power"], equipment_data["reach"])
+        )
         db.add(equipment)
     
     # Create admin user
@@ -831,8 +2159,12 @@ async def seed_data(db: Session = Depends(get_db)):
         is_admin=True
     )
     db.add(admin_user)
+    db.flush()
+    rebuild_statistics(db)
+    rebuild_search_index(db)
     
     db.commit()
+    catalog_cache.bump()
     
     return {"message": "Przykładowe dane zostały dodane do bazy danych"}
 
@@ -870,6 +2202,8 @@ DATABASE_URL=sqlite:///./spellbudex.db
 
 3. Inicjalizacja przykładowych danych:
    POST http://localhost:8000/api/seed-data
+   # albo dane w skali produkcyjnej (przed startem serwera):
+   python datagen.py --users 20000 --equipment 5000 --reservations 1000000 --seed 42
 
 4. API Documentation:
    http://localhost:8000/docs
@@ -0,0 +1,234 @@
+# backend/metrics.py
+"""
+Minimalne metryki w formacie tekstowym Prometheusa (bez zależności).
+
+Aktualizacja metryki to kilka operacji na słowniku pod niezagospodarowanym
+zwykle zamkiem - tanio na tyle, żeby zostawić włączone na produkcji.
+"""
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import threading
+import time
+
+# Domyślne przedziały histogramu opóźnień (sekundy)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Licznik zapytań SQL bieżącego requestu (mutowalny obiekt, żeby zmiany
+# z wątków puli były widoczne w middleware)
+current_request_stats: ContextVar[Optional[dict]] = ContextVar("current_request_stats", default=None)
+
+
+def _format_labels(label_names: Tuple[str, ...], label_values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [
+        f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for name, value in zip(label_names, label_values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, *label_values, amount: float = 1.0):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for label_values, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, label_values)} {value}")
+        return lines
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = (), callback: Optional[Callable[[], float]] = None):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[tuple, float] = {}
+        self.callback = callback
+
+    def inc(self, *label_values, amount: float = 1.0):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def dec(self, *label_values, amount: float = 1.0):
+        self.inc(*label_values, amount=-amount)
+
+    def set(self, value: float, *label_values):
+        self._values[label_values] = value
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        if self.callback is not None:
+            lines.append(f"{self.name} {self.callback()}")
+        for label_values, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, label_values)} {value}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label_values -> [liczniki per przedział (+Inf na końcu), suma]
+        self._values: Dict[tuple, list] = {}
+
+    def observe(self, value: float, *label_values):
+        position = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(label_values)
+            if state is None:
+                state = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][position] += 1
+            state[1] += value
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for label_values, (counts, total) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le_label = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, label_values, le_label)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, label_values)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, label_values)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests_total = registry.register(Counter(
+    "spellbudex_http_requests_total", "Liczba requestów HTTP", ("method", "route", "status")
+))
+http_request_duration_seconds = registry.register(Histogram(
+    "spellbudex_http_request_duration_seconds", "Czas obsługi requestu", ("method", "route")
+))
+http_requests_in_flight = registry.register(Gauge(
+    "spellbudex_http_requests_in_flight", "Requesty w trakcie obsługi"
+))
+sql_statements_per_request = registry.register(Histogram(
+    "spellbudex_sql_statements_per_request", "Liczba zapytań SQL na request", ("route",),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100)
+))
+db_pool_checkouts_total = registry.register(Counter(
+    "spellbudex_db_pool_checkouts_total", "Pobrania połączenia z puli"
+))
+db_pool_checked_out = registry.register(Gauge(
+    "spellbudex_db_pool_checked_out", "Połączenia aktualnie pobrane z puli"
+))
+db_pool_wait_seconds = registry.register(Histogram(
+    "spellbudex_db_pool_wait_seconds", "Czas oczekiwania na połączenie z puli",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+))
+reservation_transitions_total = registry.register(Counter(
+    "spellbudex_reservation_transitions_total", "Zmiany statusu rezerwacji wykonane przez scheduler", ("transition",)
+))
+
+
+def instrument_engine(engine):
+    """Podepnij metryki puli połączeń i zapytań SQL pod silnik SQLAlchemy"""
+    from sqlalchemy import event
+
+    pool = engine.pool
+    pool_connect = pool.connect
+
+    def timed_connect():
+        # Czas oczekiwania na połączenie (łącznie z ewentualnym otwarciem nowego)
+        started = time.perf_counter()
+        try:
+            return pool_connect()
+        finally:
+            db_pool_wait_seconds.observe(time.perf_counter() - started)
+
+    pool.connect = timed_connect
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        db_pool_checkouts_total.inc()
+        db_pool_checked_out.inc()
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        db_pool_checked_out.dec()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = current_request_stats.get()
+        if stats is not None:
+            stats["sql"] += 1
+
+
+class CacheRatio(_Metric):
+    """Współczynnik trafień cache liczony z atrybutów hits/misses obiektów"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, caches: Dict[str, object]):
+        super().__init__(name, documentation, ("cache",))
+        self.caches = caches
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for cache_name, cache in self.caches.items():
+            hits, misses = cache.hits, cache.misses
+            ratio = hits / (hits + misses) if hits + misses else 0.0
+            lines.append(f'{self.name}{{cache="{cache_name}"}} {ratio}')
+        return lines
+
+
+class CacheLookups(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, caches: Dict[str, object]):
+        super().__init__(name, documentation, ("cache", "result"))
+        self.caches = caches
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for cache_name, cache in self.caches.items():
+            lines.append(f'{self.name}{{cache="{cache_name}",result="hit"}} {cache.hits}')
+            lines.append(f'{self.name}{{cache="{cache_name}",result="miss"}} {cache.misses}')
+        return lines
+
+
+def register_caches(caches: Dict[str, object]):
+    registry.register(CacheRatio("spellbudex_cache_hit_ratio", "Współczynnik trafień cache", caches))
+    registry.register(CacheLookups("spellbudex_cache_lookups_total", "Odczyty cache (trafienia/chybienia)", caches))
@@ -1,290 +1,320 @@
 # backend/middleware.py
-from fastapi import Request, Response, HTTPException
-from fastapi.middleware.base import BaseHTTPMiddleware
-from fastapi.responses import JSONResponse
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+import hashlib
 import time
 import logging
 import jwt
-from datetime import datetime
 import json
+import os
+import re
+import uuid
+from starlette.routing import Match
+from ratelimit import RateLimiter
+from request_log import configure_logging, log_request
+import metrics
 
 # Konfiguracja
-SECRET_KEY = "spellbudex_secret_key_2025"
+SECRET_KEY = os.getenv("SECRET_KEY", "spellbudex_secret_key_2025")
 ALGORITHM = "HS256"
 
-# Konfiguracja logowania
-logging.basicConfig(level=logging.INFO)
+# Konfiguracja logowania (JSON przez kolejkę, zapis w osobnym wątku)
+configure_logging()
 logger = logging.getLogger(__name__)
 
-class AuthMiddleware(BaseHTTPMiddleware):
+
+class RoutePolicy(NamedTuple):
+    auth_required: bool
+    cost: float = 1.0
+
+
+PUBLIC = RoutePolicy(auth_required=False)
+AUTHENTICATED = RoutePolicy(auth_required=True)
+
+ANY_METHOD = "*"
+
+# Akceptowany X-Request-ID od klienta/proxy
+REQUEST_ID_PATTERN = re.compile(rb"[A-Za-z0-9._-]{1,64}")
+
+
+class RoutePolicyTable:
     """
-    Middleware do obsługi autoryzacji i logowania requestów
+    Prekompilowana tabela polityk tras: drzewo prefiksowe po segmentach ścieżki.
+
+    Segment `{param}` pasuje do dowolnego segmentu, a `*` na końcu wzorca
+    do całej reszty ścieżki. Dopasowanie kosztuje O(liczba segmentów),
+    niezależnie od liczby reguł.
     """
-    
-    # Ścieżki które nie wymagają autoryzacji
-    PUBLIC_PATHS = {
-        "/",
-        "/docs",
-        "/openapi.json",
-        "/api/auth/register",
-        "/api/auth/login",
-        "/api/equipment",  # Publiczny dostęp do sprzętu
-        "/api/seed-data",  # Inicjalizacja danych
-    }
-    
-    # Ścieżki które wymagają uprawnień admin
-    ADMIN_PATHS = {
-        "/api/statistics",
-        "/api/reservations",  # Admin może widzieć wszystkie rezerwacje
-    }
-    
-    async def dispatch(self, request: Request, call_next):
-        # Rozpocznij pomiar czasu
-        start_time = time.time()
-        
-        # Loguj incoming request
-        logger.info(f"🔄 {request.method} {request.url.path} - {request.client.host}")
-        
-        # Sprawdź autoryzację
-        auth_result = await self.check_authorization(request)
-        if auth_result:
-            return auth_result
-        
-        try:
-            # Wykonaj request
-            response = await call_next(request)
-            
-            # Oblicz czas wykonania
-            process_time = time.time() - start_time
-            
-            # Dodaj custom headers
-            response.headers["X-Process-Time"] = str(process_time)
-            response.headers["X-SpellBudex-API"] = "v1.0"
-            response.headers["X-Request-ID"] = f"req_{int(time.time())}"
-            
-            # Loguj response
-            status_emoji = "✅" if response.status_code < 400 else "❌"
-            logger.info(f"{status_emoji} {request.method} {request.url.path} - {response.status_code} ({process_time:.3f}s)")
-            
-            return response
-            
-        except Exception as e:
-            # Obsłuż błędy
-            process_time = time.time() - start_time
-            logger.error(f"💥 {request.method} {request.url.path} - ERROR: {str(e)} ({process_time:.3f}s)")
-            
-            return JSONResponse(
-                status_code=500,
-                content={"detail": "Wewnętrzny błąd serwera", "error": str(e)}
-            )
-    
-    async def check_authorization(self, request: Request):
-        """Sprawdź autoryzację użytkownika"""
-        path = request.url.path
-        method = request.method
-        
-        # Pomiń sprawdzanie dla publicznych ścieżek
-        if path in self.PUBLIC_PATHS:
-            return None
-        
-        # Pomiń sprawdzanie dla ścieżek zaczynających się od publicznych
-        if any(path.startswith(public_path) for public_path in ["/docs", "/openapi"]):
+
+    PARAM = "{}"
+    REST = "*"
+
+    def __init__(self, rules: Iterable[Tuple[str, str, RoutePolicy]], default: RoutePolicy):
+        self.default = default
+        self._root: dict = {}
+        for methods, template, policy in rules:
+            node = self._root
+            for segment in self._segments(template):
+                key = self.PARAM if segment.startswith("{") else segment
+                node = node.setdefault(key, {})
+            handlers = node.setdefault(None, {})
+            for method in methods.split(","):
+                handlers[method.strip()] = (template, policy)
+
+    @staticmethod
+    def _segments(path: str):
+        return [segment for segment in path.split("/") if segment]
+
+    def match(self, method: str, path: str) -> Tuple[Optional[str], RoutePolicy]:
+        """Zwróć (szablon trasy, polityka) dla metody i ścieżki"""
+        found = self._match(self._root, self._segments(path), 0, method)
+        return found if found is not None else (None, self.default)
+
+    def _match(self, node: dict, segments, position: int, method: str):
+        if position == len(segments):
+            found = self._handler(node, method)
+            if found is None and self.REST in node:
+                found = self._handler(node[self.REST], method)
+            return found
+        segment = segments[position]
+        for key in (segment, self.PARAM):
+            child = node.get(key)
+            if child is not None:
+                found = self._match(child, segments, position + 1, method)
+                if found is not None:
+                    return found
+        if self.REST in node:
+            return self._handler(node[self.REST], method)
+        return None
+
+    @staticmethod
+    def _handler(node: dict, method: str):
+        handlers = node.get(None)
+        if not handlers:
             return None
-        
-        # Sprawdź czy ścieżka wymaga autoryzacji
-        if path.startswith("/api/"):
-            # Pobierz token z nagłówka
-            authorization = request.headers.get("Authorization")
-            if not authorization or not authorization.startswith("Bearer "):
-                logger.warning(f"🔒 Brak tokenu dla {path}")
-                return JSONResponse(
-                    status_code=401,
-                    content={"detail": "Brak tokenu autoryzacji"}
-                )
-            
-            token = authorization.split(" ")[1]
-            
-            try:
-                # Zdekoduj token
-                payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-                email = payload.get("sub")
-                
-                if not email:
-                    logger.warning(f"🔒 Nieprawidłowy token dla {path}")
-                    return JSONResponse(
-                        status_code=401,
-                        content={"detail": "Nieprawidłowy token"}
-                    )
-                
-                # Dodaj dane użytkownika do request state
-                request.state.user_email = email
-                
-                # Sprawdź uprawnienia admin dla określonych ścieżek
-                if self.requires_admin(path, method):
-                    # Tu powinieneś sprawdzić w bazie czy użytkownik to admin
-                    # Na razie zakładamy że jest, ale w produkcji zrób query do DB
-                    if email != "admin@spellbudex.pl":  # Tymczasowe rozwiązanie
-                        logger.warning(f"🚫 Brak uprawnień admin dla {email} na {path}")
-                        return JSONResponse(
-                            status_code=403,
-                            content={"detail": "Brak uprawnień administratora"}
-                        )
-                
-                logger.info(f"🔓 Autoryzacja OK: {email} -> {path}")
-                return None
-                
-            except jwt.ExpiredSignatureError:
-                logger.warning(f"⏰ Token wygasł dla {path}")
-                return JSONResponse(
-                    status_code=401,
-                    content={"detail": "Token wygasł"}
-                )
-            except jwt.InvalidTokenError:
-                logger.warning(f"🔒 Nieprawidłowy token dla {path}")
-                return JSONResponse(
-                    status_code=401,
-                    content={"detail": "Nieprawidłowy token"}
-                )
-        
+        return handlers.get(method) or handlers.get(ANY_METHOD)
+
+
+# Polityki tras API; wszystko poza /api jest publiczne
+ROUTE_POLICIES = [
+    ("GET", "/api/equipment", PUBLIC),
+    ("GET", "/api/equipment/availability", RoutePolicy(auth_required=False, cost=2)),
+    ("GET", "/api/equipment/search", RoutePolicy(auth_required=False, cost=2)),
+    ("GET", "/api/equipment/{equipment_id}", PUBLIC),
+    ("POST", "/api/auth/register", RoutePolicy(auth_required=False, cost=10)),
+    ("POST", "/api/auth/login", RoutePolicy(auth_required=False, cost=10)),
+    ("POST", "/api/auth/google", RoutePolicy(auth_required=False, cost=5)),
+    ("POST", "/api/seed-data", PUBLIC),
+    ("POST", "/api/quotes", RoutePolicy(auth_required=False, cost=2)),
+    ("GET", "/api/promotions", PUBLIC),
+    ("GET", "/api/events", PUBLIC),
+    ("POST", "/api/reservations/batch", RoutePolicy(auth_required=True, cost=5)),
+    ("POST", "/api/equipment/bulk", RoutePolicy(auth_required=True, cost=20)),
+    (ANY_METHOD, "/api/*", AUTHENTICATED),
+]
+
+# Nagłówki bezpieczeństwa dodawane do każdej odpowiedzi
+SECURITY_HEADERS = [
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"x-xss-protection", b"1; mode=block"),
+    (b"referrer-policy", b"strict-origin-when-cross-origin"),
+    (b"x-spellbudex-api", b"v1.0"),
+]
+
+# CSP pomijamy dla dokumentacji (Swagger UI / ReDoc ładują zasoby z CDN)
+CONTENT_SECURITY_POLICY = (b"content-security-policy", b"default-src 'self'")
+DOCS_PATHS = ("/docs", "/redoc")
+
+ALLOWED_ORIGINS = {
+    "http://localhost:3000",
+    "http://127.0.0.1:3000",
+    "http://localhost:3001",  # Dla dev
+    "https://spellbudex.vercel.app",  # Dla produkcji
+}
+
+CORS_HEADERS = [
+    (b"access-control-allow-credentials", b"true"),
+    (b"access-control-allow-methods", b"GET, POST, PUT, DELETE, OPTIONS"),
+    (b"access-control-allow-headers", b"Authorization, Content-Type, X-Requested-With, If-None-Match"),
+    (b"access-control-expose-headers", b"ETag, Link, X-Next-Cursor, X-Request-ID, Retry-After"),
+    (b"access-control-max-age", b"86400"),  # 24 godziny
+]
+
+
+def log_subject(claims: Optional[dict]) -> Optional[str]:
+    """Użytkownik w logu dostępowym: id z tokenu, nigdy email (dane osobowe)"""
+    if not claims:
         return None
-    
-    def requires_admin(self, path: str, method: str) -> bool:
-        """Sprawdź czy ścieżka wymaga uprawnień admin"""
-        
-        # Ścieżki zawsze wymagające admin
-        if any(path.startswith(admin_path) for admin_path in self.ADMIN_PATHS):
-            return True
-        
-        # POST/PUT/DELETE na sprzęcie wymaga admin
-        if path.startswith("/api/equipment") and method in ["POST", "PUT", "DELETE"]:
-            return True
-        
-        # Zarządzanie statusem rezerwacji wymaga admin
-        if "/status" in path and method == "PUT":
-            return True
-        
-        return False
+    if claims.get("uid") is not None:
+        return str(claims["uid"])
+    # Token wydany przed dodaniem "uid" - skrót z kluczem zamiast emaila
+    digest = hashlib.blake2b(claims["sub"].encode("utf-8"), digest_size=8, key=SECRET_KEY.encode("utf-8")[:64])
+    return f"sub:{digest.hexdigest()}"
 
 
-class SecurityMiddleware(BaseHTTPMiddleware):
-    """
-    Middleware bezpieczeństwa - dodaje nagłówki bezpieczeństwa
-    """
-    
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
-        
-        # Dodaj nagłówki bezpieczeństwa
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        response.headers["Content-Security-Policy"] = "default-src 'self'"
-        
-        # Usuń nagłówki które mogą ujawnić informacje o serwerze
-        response.headers.pop("Server", None)
-        
-        return response
-
-
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """
-    Prosty rate limiting middleware
-    """
-    
-    def __init__(self, app, calls: int = 100, period: int = 60):
-        super().__init__(app)
-        self.calls = calls  # Maksymalna liczba requestów
-        self.period = period  # Okres w sekundach
-        self.clients = {}  # Przechowuje dane o klientach
-    
-    async def dispatch(self, request: Request, call_next):
-        client_ip = request.client.host
-        current_time = time.time()
-        
-        # Wyczyść stare rekordy
-        self.cleanup_old_records(current_time)
-        
-        # Sprawdź rate limit dla klienta
-        if client_ip not in self.clients:
-            self.clients[client_ip] = []
-        
-        client_requests = self.clients[client_ip]
-        
-        # Usuń stare requesty dla tego klienta
-        client_requests[:] = [req_time for req_time in client_requests 
-                            if current_time - req_time < self.period]
-        
-        # Sprawdź czy przekroczył limit
-        if len(client_requests) >= self.calls:
-            logger.warning(f"🚨 Rate limit exceeded dla {client_ip}")
-            return JSONResponse(
-                status_code=429,
-                content={"detail": "Zbyt wiele requestów. Spróbuj ponownie za chwilę."}
-            )
-        
-        # Dodaj obecny request
-        client_requests.append(current_time)
-        
-        # Wykonaj request
-        response = await call_next(request)
-        
-        # Dodaj nagłówki rate limit
-        remaining = self.calls - len(client_requests)
-        response.headers["X-RateLimit-Limit"] = str(self.calls)
-        response.headers["X-RateLimit-Remaining"] = str(remaining)
-        response.headers["X-RateLimit-Reset"] = str(int(current_time + self.period))
-        
-        return response
-    
-    def cleanup_old_records(self, current_time):
-        """Usuń stare rekordy żeby zaoszczędzić pamięć"""
-        cutoff_time = current_time - self.period
-        for client_ip in list(self.clients.keys()):
-            self.clients[client_ip] = [req_time for req_time in self.clients[client_ip] 
-                                     if req_time > cutoff_time]
-            if not self.clients[client_ip]:
-                del self.clients[client_ip]
-
-
-class CORSMiddleware(BaseHTTPMiddleware):
+def origin_allowed(origin: Optional[str]) -> bool:
+    # Tylko dokładne dopasowanie - odpowiadamy z allow-credentials, więc
+    # "https://localhost.attacker.example" nie może przejść testem podciągu
+    return bool(origin) and origin in ALLOWED_ORIGINS
+
+
+class ApiGatewayMiddleware:
     """
-    Custom CORS middleware z większą kontrolą
+    Jeden middleware ASGI zamiast stosu BaseHTTPMiddleware: nagłówki
+    bezpieczeństwa, CORS, rate limiting i polityka autoryzacji z tabeli tras.
+    Odpowiedzi (także strumieniowe) przechodzą bez buforowania - dopisujemy
+    tylko nagłówki do komunikatu http.response.start.
     """
-    
-    ALLOWED_ORIGINS = [
-        "http://localhost:3000",
-        "http://127.0.0.1:3000",
-        "http://localhost:3001",  # Dla dev
-        "https://spellbudex.vercel.app",  # Dla produkcji
-    ]
-    
-    async def dispatch(self, request: Request, call_next):
-        # Obsłuż preflight requests
-        if request.method == "OPTIONS":
-            response = Response()
-            return self.add_cors_headers(response, request)
-        
-        # Wykonaj normalny request
-        response = await call_next(request)
-        
-        # Dodaj CORS headers
-        return self.add_cors_headers(response, request)
-    
-    def add_cors_headers(self, response: Response, request: Request):
-        origin = request.headers.get("Origin")
-        
-        # Sprawdź czy origin jest dozwolony
-        if origin in self.ALLOWED_ORIGINS:
-            response.headers["Access-Control-Allow-Origin"] = origin
-        else:
-            # W development pozwól na wszystko localhost
-            if origin and ("localhost" in origin or "127.0.0.1" in origin):
-                response.headers["Access-Control-Allow-Origin"] = origin
-        
-        response.headers["Access-Control-Allow-Credentials"] = "true"
-        response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS"
-        response.headers["Access-Control-Allow-Headers"] = "Authorization, Content-Type, X-Requested-With"
-        response.headers["Access-Control-Max-Age"] = "86400"  # 24 godziny
-        
-        return response
\ No newline at end of file
+
+    def __init__(self, app, calls: int = 100, period: int = 60, rate_limit_backend=None, user_costs: Dict[str, float] = None, policies=ROUTE_POLICIES):
+        self.app = app
+        self.calls = calls
+        self.policies = RoutePolicyTable(policies, default=PUBLIC)
+        self.limiter = RateLimiter(
+            calls=calls,
+            period=period,
+            backend=rate_limit_backend,
+            client_costs={f"user:{email}": cost for email, cost in (user_costs or {}).items()}
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        method = scope["method"]
+        path = scope["path"]
+        headers = dict(scope["headers"])
+        origin = headers.get(b"origin", b"").decode("latin-1") or None
+        request_id = self._request_id(headers.get(b"x-request-id"))
+
+        extra_headers = list(SECURITY_HEADERS)
+        extra_headers.append((b"x-request-id", request_id.encode()))
+        if not path.startswith(DOCS_PATHS):
+            extra_headers.append(CONTENT_SECURITY_POLICY)
+        if origin_allowed(origin):
+            extra_headers.append((b"access-control-allow-origin", origin.encode("latin-1")))
+            extra_headers.append((b"vary", b"Origin"))
+            extra_headers.extend(CORS_HEADERS)
+
+        # Preflight CORS
+        if method == "OPTIONS" and b"access-control-request-method" in headers:
+            await self._respond(send, 200, b"", extra_headers)
+            return
+
+        template, policy = self.policies.match(method, path)
+        claims = self._authenticate(headers.get(b"authorization"))
+        user_email = claims["sub"] if claims else None
+        log_user = log_subject(claims)
+
+        if policy.auth_required and user_email is None and self._route_exists(scope):
+            await self._respond(send, 401, {"detail": "Brak tokenu autoryzacji lub token nieprawidłowy"}, extra_headers)
+            log_request(method, template or path, 401, time.perf_counter() - start_time, None, request_id)
+            return
+
+        state = scope.setdefault("state", {})
+        state["user_email"] = user_email
+        # Zdekodowany token dla get_current_user - bez drugiego jwt.decode
+        state["token_claims"] = claims
+        state["request_id"] = request_id
+
+        # Rate limiting - zalogowani per użytkownik, pozostali per IP
+        client = scope.get("client")
+        client_key = f"user:{user_email}" if user_email else f"ip:{client[0] if client else 'unknown'}"
+        now = time.time()
+        limit = await self.limiter.hit_async(client_key, path, cost=policy.cost, now=now)
+        extra_headers.append((b"x-ratelimit-limit", str(self.calls).encode()))
+        extra_headers.append((b"x-ratelimit-remaining", str(int(limit.remaining)).encode()))
+        extra_headers.append((b"x-ratelimit-reset", str(int(now + limit.reset_after)).encode()))
+        if not limit.allowed:
+            extra_headers.append((b"retry-after", str(int(limit.retry_after) + 1).encode()))
+            await self._respond(send, 429, {"detail": "Zbyt wiele requestów. Spróbuj ponownie za chwilę."}, extra_headers)
+            log_request(method, template or path, 429, time.perf_counter() - start_time, log_user, request_id)
+            return
+
+        status_holder = {"status": 500, "started": False}
+        stats_token = metrics.current_request_stats.set({"sql": 0})
+        metrics.http_requests_in_flight.inc()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder["status"] = message["status"]
+                status_holder["started"] = True
+                process_time = time.perf_counter() - start_time
+                response_headers = [
+                    (name, value) for name, value in message.get("headers", [])
+                    if name.lower() != b"server"
+                ]
+                response_headers.extend(extra_headers)
+                response_headers.append((b"x-process-time", str(process_time).encode()))
+                message = {**message, "headers": response_headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            logger.exception("unhandled error", extra={"method": method, "path": path, "request_id": request_id})
+            if status_holder["started"]:
+                raise
+            await self._respond(send, 500, {"detail": "Wewnętrzny błąd serwera"}, extra_headers)
+            return
+        finally:
+            duration = time.perf_counter() - start_time
+            route_label = self._route_label(scope, template)
+            self._record_metrics(method, route_label, status_holder["status"], duration)
+            metrics.current_request_stats.reset(stats_token)
+            log_request(method, route_label, status_holder["status"], duration, log_user, request_id)
+
+    @staticmethod
+    def _route_label(scope, template: Optional[str]) -> str:
+        # Szablon trasy (nie surowa ścieżka), żeby nie mnożyć serii i kluczy logów
+        route = scope.get("route")
+        return getattr(route, "path", None) or template or "unmatched"
+
+    @staticmethod
+    def _record_metrics(method: str, route_label: str, status_code: int, duration: float):
+        stats = metrics.current_request_stats.get()
+        metrics.http_requests_in_flight.dec()
+        metrics.http_request_duration_seconds.observe(duration, method, route_label)
+        metrics.http_requests_total.inc(method, route_label, str(status_code))
+        metrics.sql_statements_per_request.observe(stats["sql"], route_label)
+
+    @staticmethod
+    def _request_id(incoming: Optional[bytes]) -> str:
+        """ID z nagłówka klienta/proxy (jeśli rozsądny), inaczej nowy UUID"""
+        if incoming and REQUEST_ID_PATTERN.fullmatch(incoming):
+            return incoming.decode("ascii")
+        return uuid.uuid4().hex
+
+    @staticmethod
+    def _route_exists(scope) -> bool:
+        """
+        Czy aplikacja ma trasę pod tą ścieżką (dowolna metoda). Reguła "/api/*"
+        chroni tylko istniejące trasy - nieznana ścieżka idzie do routera (404).
+        Wołane tylko dla anonimowych żądań do tras wymagających logowania.
+        """
+        router = getattr(scope.get("app"), "router", None)
+        if router is None:
+            return True
+        return any(route.matches(scope)[0] != Match.NONE for route in router.routes)
+
+    @staticmethod
+    def _authenticate(authorization: Optional[bytes]) -> Optional[dict]:
+        """Zwróć claims poprawnego tokenu Bearer (z "sub") albo None"""
+        if not authorization or not authorization.startswith(b"Bearer "):
+            return None
+        try:
+            payload = jwt.decode(authorization[7:].decode("latin-1"), SECRET_KEY, algorithms=[ALGORITHM])
+        except jwt.InvalidTokenError:
+            return None
+        return payload if payload.get("sub") else None
+
+    @staticmethod
+    async def _respond(send, status_code: int, content, extra_headers):
+        body = content if isinstance(content, bytes) else json.dumps(content, ensure_ascii=False).encode("utf-8")
+        headers = [(b"content-length", str(len(body)).encode())]
+        if not isinstance(content, bytes):
+            headers.append((b"content-type", b"application/json"))
+        await send({"type": "http.response.start", "status": status_code, "headers": headers + list(extra_headers)})
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,90 @@
+# backend/passwords.py
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+import os
+import threading
+
+import bcrypt
+
+# Koszt bcrypt dla nowych hashy - zmiana powoduje przehashowanie przy logowaniu
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+# Pula procesów do hashowania (domyślnie tyle, ile rdzeni)
+HASH_POOL_WORKERS = int(os.getenv("HASH_POOL_WORKERS", str(os.cpu_count() or 1)))
+
+# Maksymalna liczba operacji w kolejce + w trakcie; powyżej zwracamy 503
+HASH_QUEUE_SIZE = int(os.getenv("HASH_QUEUE_SIZE", str(HASH_POOL_WORKERS * 4)))
+
+
+class HashingPoolSaturated(Exception):
+    """Kolejka hashowania haseł jest pełna"""
+
+
+def _hash(password: bytes, rounds: int) -> bytes:
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+
+def _check(password: bytes, hashed: bytes) -> bool:
+    return bcrypt.checkpw(password, hashed)
+
+
+class PasswordHasher:
+    """
+    Hashowanie bcrypt w osobnej puli procesów z ograniczoną kolejką,
+    żeby seria logowań nie zagłodziła reszty API.
+    """
+
+    def __init__(self, workers: int = HASH_POOL_WORKERS, queue_size: int = HASH_QUEUE_SIZE, rounds: int = BCRYPT_ROUNDS):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.rounds = rounds
+        self._slots = threading.BoundedSemaphore(queue_size)
+        self._in_flight = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._depth_lock = threading.Lock()
+
+    @property
+    def queue_depth(self) -> int:
+        """Liczba operacji oczekujących lub wykonywanych"""
+        return self._in_flight
+
+    def start(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingPoolSaturated()
+        with self._depth_lock:
+            self._in_flight += 1
+        try:
+            self.start()
+            return self._executor.submit(fn, *args).result()
+        finally:
+            with self._depth_lock:
+                self._in_flight -= 1
+            self._slots.release()
+
+    def hash(self, password: str) -> str:
+        return self._run(_hash, password.encode('utf-8'), self.rounds).decode('utf-8')
+
+    def verify(self, password: str, hashed_password: str) -> bool:
+        if not hashed_password:
+            # Konta bez hasła (np. logowanie przez Google)
+            return False
+        return self._run(_check, password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """Czy hash ma inny koszt niż skonfigurowany (format $2b$12$...)"""
+        try:
+            return int(hashed_password.split("$")[2]) != self.rounds
+        except (AttributeError, IndexError, ValueError):
+            return False
@@ -0,0 +1,173 @@
+# backend/pricing.py
+"""
+Silnik wycen: stawka dzienna, stawka weekendowa, progi wynajmu
+długoterminowego i promocje kategorii.
+
+Reguły (progi + promocje z bazy) są kompilowane raz do struktur
+słownikowych i trzymane w pamięci do unieważnienia albo upływu TTL.
+Wycena linii nie iteruje po dniach - liczba dni weekendowych wynika
+z liczby pełnych tygodni i tablicy dla niepełnego tygodnia, więc koszt
+jest stały niezależnie od długości wynajmu.
+"""
+from bisect import bisect_right
+from datetime import date
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+import os
+import threading
+import time
+
+# Progi rabatu za długość wynajmu, np. "7:15,14:20,30:25" (7-13 dni 15%...).
+# Domyślnie brak - rabaty ze strony promocji (LONG25, WEEKEND33) zakłada się
+# jako promocje z kodem (POST /api/promotions), które nie łączą się z innymi
+PRICING_TIERS = os.getenv("PRICING_TIERS", "")
+
+# Mnożnik stawki za sobotę i niedzielę (1.0 = jak w dzień roboczy)
+WEEKEND_RATE = float(os.getenv("WEEKEND_RATE", "1.0"))
+
+# Jak długo (s) skompilowane reguły są ważne bez unieważnienia (inne workery)
+PRICING_RULES_TTL = float(os.getenv("PRICING_RULES_TTL", "60"))
+
+WEEKEND_DAYS = (5, 6)  # sobota, niedziela
+
+# WEEKEND_IN_PARTIAL_WEEK[dzień tygodnia startu][liczba dni < 7] -> dni weekendowe
+WEEKEND_IN_PARTIAL_WEEK = tuple(
+    tuple(sum(1 for offset in range(length) if (weekday + offset) % 7 in WEEKEND_DAYS) for length in range(7))
+    for weekday in range(7)
+)
+
+
+class PricingError(ValueError):
+    """Niepoprawna linia wyceny (np. odwrócone daty)"""
+
+
+class PromotionRule(NamedTuple):
+    id: int
+    name: str
+    code: Optional[str]
+    category: Optional[str]  # None = wszystkie kategorie
+    discount_percent: float
+    valid_from: Optional[date]
+    valid_until: Optional[date]
+
+
+class PriceLine(NamedTuple):
+    days: int
+    weekend_days: int
+    base_amount: float  # dni * stawka dzienna
+    tier_discount_percent: float
+    promotion: Optional[PromotionRule]
+    total: float
+
+
+def parse_tiers(spec: str) -> Tuple[Tuple[int, float], ...]:
+    """Format "7:15,14:20" -> ((7, 15.0), (14, 20.0))"""
+    tiers = []
+    for part in spec.split(","):
+        if part.strip():
+            min_days, discount = part.split(":")
+            tiers.append((int(min_days), float(discount)))
+    return tuple(sorted(tiers))
+
+
+def count_weekend_days(start: date, days: int) -> int:
+    full_weeks, remainder = divmod(days, 7)
+    return full_weeks * len(WEEKEND_DAYS) + WEEKEND_IN_PARTIAL_WEEK[start.weekday()][remainder]
+
+
+class CompiledRules:
+    """Niezmienny snapshot reguł gotowy do wyceny"""
+
+    def __init__(self, tiers: Tuple[Tuple[int, float], ...], weekend_rate: float, promotions: Iterable[PromotionRule]):
+        self.tier_thresholds = [min_days for min_days, _ in tiers]
+        self.tier_discounts = [discount for _, discount in tiers]
+        self.weekend_rate = weekend_rate
+        # kategoria (None = wszystkie) -> promocje od największego rabatu
+        self.promotions: Dict[Optional[str], List[PromotionRule]] = {}
+        for promotion in sorted(promotions, key=lambda rule: -rule.discount_percent):
+            self.promotions.setdefault(promotion.category, []).append(promotion)
+
+    def tier_discount(self, days: int) -> float:
+        position = bisect_right(self.tier_thresholds, days)
+        return self.tier_discounts[position - 1] if position else 0.0
+
+    def best_promotion(self, category: Optional[str], start: date, promo_code: Optional[str]) -> Optional[PromotionRule]:
+        best = None
+        for candidates in (self.promotions.get(category, ()), self.promotions.get(None, ())):
+            for promotion in candidates:
+                if promotion.code is not None and promotion.code != promo_code:
+                    continue
+                if promotion.valid_from and start < promotion.valid_from:
+                    continue
+                if promotion.valid_until and start > promotion.valid_until:
+                    continue
+                if best is None or promotion.discount_percent > best.discount_percent:
+                    best = promotion
+                break  # posortowane malejąco - pierwsza pasująca jest najlepsza w tej grupie
+        return best
+
+    def price(self, daily_rate: float, category: Optional[str], start: date, end: date, promo_code: Optional[str] = None) -> PriceLine:
+        days = (end - start).days + 1
+        if days < 1:
+            raise PricingError("Data zakończenia nie może być wcześniejsza niż data rozpoczęcia")
+        weekend_days = count_weekend_days(start, days)
+        rental = daily_rate * (days - weekend_days + weekend_days * self.weekend_rate)
+        tier_discount = self.tier_discount(days)
+        promotion = self.best_promotion(category, start, promo_code)
+        promotion_discount = promotion.discount_percent if promotion else 0.0
+        total = rental * (1 - tier_discount / 100) * (1 - promotion_discount / 100)
+        return PriceLine(days, weekend_days, round(days * daily_rate, 2), tier_discount, promotion, round(total, 2))
+
+
+class PricingEngine:
+    """
+    Trzyma skompilowane reguły; `loader(session)` zwraca aktywne promocje
+    (PromotionRule) i jest wołany tylko po unieważnieniu albo po TTL -
+    na sesji wołającego, żeby nie zajmować drugiego połączenia z puli.
+    """
+
+    def __init__(self, loader: Callable[[object], List[PromotionRule]], tiers: str = PRICING_TIERS, weekend_rate: float = WEEKEND_RATE, ttl: float = PRICING_RULES_TTL):
+        self.loader = loader
+        self.tiers = parse_tiers(tiers)
+        self.weekend_rate = weekend_rate
+        self.ttl = ttl
+        self._rules: Optional[CompiledRules] = None
+        self._compiled_at = 0.0
+        self._version = 0
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+
+    def invalidate(self):
+        with self._lock:
+            self._version += 1
+            # Snapshot nieaktualny, ale służy innym wątkom do końca przeładowania
+            self._compiled_at = float("-inf")
+
+    def _fresh(self) -> Optional[CompiledRules]:
+        rules = self._rules
+        if rules is not None and time.monotonic() - self._compiled_at < self.ttl:
+            return rules
+        return None
+
+    def rules(self, session) -> CompiledRules:
+        rules = self._fresh()
+        if rules is not None:
+            return rules
+        # Przeładowuje jeden wątek; pozostali dostają poprzedni snapshot
+        # (czekają tylko przy pierwszym ładowaniu, gdy snapshotu jeszcze nie ma)
+        if not self._reload_lock.acquire(blocking=self._rules is None):
+            return self._rules
+        try:
+            rules = self._fresh()
+            if rules is not None:
+                return rules
+            with self._lock:
+                version = self._version
+            compiled = CompiledRules(self.tiers, self.weekend_rate, self.loader(session))
+            with self._lock:
+                # Nie oznaczaj jako aktualne, jeśli w trakcie kompilacji przyszło unieważnienie
+                if version == self._version:
+                    self._compiled_at = time.monotonic()
+                self._rules = compiled
+            return compiled
+        finally:
+            self._reload_lock.release()
@@ -0,0 +1,156 @@
+# backend/ratelimit.py
+from collections import OrderedDict
+from functools import partial
+from typing import NamedTuple, Optional
+import os
+import sqlite3
+import threading
+import time
+
+import anyio
+
+# Backend limitera: "memory" (per proces) albo "sqlite" (wspólny dla workerów)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_SQLITE_PATH = os.getenv("RATE_LIMIT_SQLITE_PATH", "./ratelimit.db")
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "100000"))
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    remaining: float
+    retry_after: float  # sekundy do momentu, w którym żądanie by przeszło
+    reset_after: float  # sekundy do pełnego wiadra
+
+
+def refill(tokens: float, updated_at: float, now: float, rate: float, capacity: float) -> float:
+    return min(capacity, tokens + (now - updated_at) * rate)
+
+
+def consume(tokens: float, cost: float, rate: float, capacity: float):
+    """Spróbuj zabrać `cost` żetonów; zwraca (nowy stan, wynik)"""
+    if tokens >= cost:
+        tokens -= cost
+        return tokens, RateLimitResult(True, tokens, 0.0, (capacity - tokens) / rate)
+    return tokens, RateLimitResult(False, tokens, (cost - tokens) / rate, (capacity - tokens) / rate)
+
+
+class MemoryBackend:
+    """
+    Token bucket w pamięci procesu - O(1) na żądanie.
+    Pamięć ograniczona do `max_clients` (LRU); wypadają najdawniej aktywni,
+    a ich wiadra i tak zdążyły się już napełnić.
+    """
+
+    # Nie dotyka dysku ani sieci - można wołać bezpośrednio z pętli zdarzeń
+    blocking = False
+
+    def __init__(self, max_clients: int = RATE_LIMIT_MAX_CLIENTS):
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, cost: float, rate: float, capacity: float, now: float) -> RateLimitResult:
+        with self._lock:
+            state = self._buckets.get(key)
+            tokens = capacity if state is None else refill(state[0], state[1], now, rate, capacity)
+            tokens, result = consume(tokens, cost, rate, capacity)
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+            return result
+
+
+class SQLiteBackend:
+    """
+    Token bucket w pliku SQLite (WAL) - limity wspólne dla wszystkich
+    workerów uvicorna na jednej maszynie. Jedna krótka transakcja na żądanie.
+    """
+
+    # Co ile wywołań usuwać wiadra, które zdążyły się już napełnić
+    CLEANUP_EVERY = 1000
+
+    # Transakcja na pliku (fsync, czekanie na blokadę do 5 s) - poza pętlą zdarzeń
+    blocking = True
+
+    def __init__(self, path: str = RATE_LIMIT_SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._calls = 0
+        connection = self._connection()
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def take(self, key: str, cost: float, rate: float, capacity: float, now: float) -> RateLimitResult:
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute("SELECT tokens, updated_at FROM rate_limits WHERE key = ?", (key,)).fetchone()
+            tokens = capacity if row is None else refill(row[0], row[1], now, rate, capacity)
+            tokens, result = consume(tokens, cost, rate, capacity)
+            connection.execute(
+                "INSERT INTO rate_limits (key, tokens, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at",
+                (key, tokens, now),
+            )
+            self._calls += 1
+            if self._calls % self.CLEANUP_EVERY == 0:
+                connection.execute("DELETE FROM rate_limits WHERE updated_at < ?", (now - capacity / rate,))
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return result
+
+
+def create_backend(name: str = RATE_LIMIT_BACKEND):
+    if name == "sqlite":
+        return SQLiteBackend()
+    if name == "memory":
+        return MemoryBackend()
+    raise ValueError(f"Nieznany backend rate limitera: {name}")
+
+
+class RateLimiter:
+    """
+    Limiter typu token bucket: `calls` żądań na `period` sekund, z wagami.
+    Koszt żądania = koszt trasy (najdłuższy pasujący prefiks) * waga klienta.
+    """
+
+    def __init__(self, calls: int = 100, period: int = 60, backend=None, route_costs: Optional[dict] = None, client_costs: Optional[dict] = None):
+        self.calls = calls
+        self.period = period
+        self.capacity = float(calls)
+        self.rate = calls / period
+        self.backend = backend or create_backend()
+        # Najdłuższe prefiksy najpierw
+        self.route_costs = sorted((route_costs or {}).items(), key=lambda item: len(item[0]), reverse=True)
+        self.client_costs = client_costs or {}
+
+    def route_cost(self, path: str) -> float:
+        for prefix, cost in self.route_costs:
+            if path.startswith(prefix):
+                return cost
+        return 1.0
+
+    def hit(self, client_key: str, path: str, cost: Optional[float] = None, now: Optional[float] = None) -> RateLimitResult:
+        if cost is None:
+            cost = self.route_cost(path)
+        cost *= self.client_costs.get(client_key, 1.0)
+        return self.backend.take(client_key, cost, self.rate, self.capacity, time.time() if now is None else now)
+
+    async def hit_async(self, client_key: str, path: str, cost: Optional[float] = None, now: Optional[float] = None) -> RateLimitResult:
+        """`hit` dla kodu async - blokujący backend idzie do puli wątków"""
+        if getattr(self.backend, "blocking", True):
+            return await anyio.to_thread.run_sync(partial(self.hit, client_key, path, cost, now))
+        return self.hit(client_key, path, cost, now)
@@ -0,0 +1,119 @@
+# backend/request_log.py
+"""
+Logowanie requestów przez kolejkę: handler na pętli zdarzeń tylko wrzuca
+rekord do kolejki, a formatowanie JSON i zapis robi osobny wątek.
+"""
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+
+# Jaka część udanych (< 400) requestów trafia do logu; błędy zawsze
+LOG_SAMPLE_SUCCESS = float(os.getenv("LOG_SAMPLE_SUCCESS", "0.1"))
+
+# Maksymalna liczba rekordów czekających na zapis; nadmiar jest odrzucany
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+access_logger = logging.getLogger("spellbudex.access")
+
+# Standardowe atrybuty LogRecord - wszystko inne to pola strukturalne z `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Jeden obiekt JSON na linię"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler, który nie formatuje rekordu w wątku wywołującym
+    i przy pełnej kolejce odrzuca rekord zamiast blokować.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: Optional[QueueListener] = None
+queue_handler: Optional[DroppingQueueHandler] = None
+
+
+def configure_logging(stream=None):
+    """Podłącz kolejkę do root loggera i uruchom wątek zapisujący (raz na proces)"""
+    global _listener, queue_handler
+    if _listener is not None:
+        return queue_handler
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter())
+
+    queue_handler = DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(LOG_LEVEL)
+
+    _listener = QueueListener(queue_handler.queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return queue_handler
+
+
+def stop_logging():
+    """Zatrzymaj wątek zapisujący, opróżniając kolejkę"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def should_log(status_code: int, sample_rate: float = LOG_SAMPLE_SUCCESS) -> bool:
+    if status_code >= 400:
+        return True
+    return sample_rate >= 1.0 or random.random() < sample_rate
+
+
+def log_request(method: str, route: str, status_code: int, duration: float, user_id: Optional[str], request_id: str):
+    """Rekord dostępowy; pola trafiają do JSON jako osobne klucze (bez emaila)"""
+    if not should_log(status_code):
+        return
+    level = logging.ERROR if status_code >= 500 else logging.WARNING if status_code >= 400 else logging.INFO
+    access_logger.log(level, "request", extra={
+        "method": method,
+        "route": route,
+        "status": status_code,
+        "duration_ms": round(duration * 1000, 3),
+        "user_id": user_id,
+        "request_id": request_id,
+    })
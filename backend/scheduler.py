@@ -0,0 +1,158 @@
+# backend/scheduler.py
+"""
+Okresowe zadania w tle z jednym liderem na wszystkie workery.
+
+Każdy worker uruchamia pętlę (z lifespan aplikacji), ale zadanie wykonuje
+tylko posiadacz dzierżawy - wiersza w tabeli bazy z terminem ważności.
+Lider przedłuża dzierżawę przy każdym przebiegu; jeśli jego proces zginie,
+po `ttl` sekundach przejmuje ją inny worker.
+
+Po przebiegu, który coś zmienił, lider podbija `generation` w wierszu
+dzierżawy - pozostałe workery widzą zmianę i czyszczą swoje cache.
+"""
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+import asyncio
+import logging
+import os
+import socket
+import uuid
+
+import anyio
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+# Czy uruchamiać zadania w tle (wyłączenie np. w testach obciążeniowych)
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "1") == "1"
+
+# Co ile sekund przebieg zadania / sprawdzenie dzierżawy
+SCHEDULER_INTERVAL = float(os.getenv("SCHEDULER_INTERVAL", "60"))
+
+# Ważność dzierżawy lidera - musi być dłuższa niż interwał
+SCHEDULER_LEASE_TTL = float(os.getenv("SCHEDULER_LEASE_TTL", str(SCHEDULER_INTERVAL * 3)))
+
+logger = logging.getLogger("spellbudex.scheduler")
+
+
+class LeaderLease:
+    """Dzierżawa lidera w tabeli bazy (kolumny: name, holder, expires_at, generation)"""
+
+    def __init__(self, session_factory, model, name: str, ttl: float = SCHEDULER_LEASE_TTL):
+        self.session_factory = session_factory
+        self.model = model
+        self.name = name
+        self.ttl = ttl
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def acquire(self) -> bool:
+        """Przejmij albo przedłuż dzierżawę; False, jeśli ważną ma ktoś inny"""
+        model = self.model
+        now = datetime.utcnow()
+        db = self.session_factory()
+        try:
+            updated = db.query(model).filter(
+                model.name == self.name,
+                (model.holder == self.holder) | (model.expires_at < now),
+            ).update(
+                {model.holder: self.holder, model.expires_at: now + timedelta(seconds=self.ttl)},
+                synchronize_session=False,
+            )
+            if not updated:
+                if db.query(model.name).filter(model.name == self.name).first() is not None:
+                    db.rollback()
+                    return False
+                db.add(model(name=self.name, holder=self.holder, expires_at=now + timedelta(seconds=self.ttl), generation=0))
+            db.commit()
+            return True
+        except IntegrityError:
+            # Inny worker utworzył wiersz równolegle
+            db.rollback()
+            return False
+        finally:
+            db.close()
+
+    def release(self):
+        """Oddaj dzierżawę od razu (np. przy zamykaniu workera)"""
+        model = self.model
+        db = self.session_factory()
+        try:
+            db.query(model).filter(model.name == self.name, model.holder == self.holder).update(
+                {model.expires_at: datetime.utcnow()}, synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def generation(self) -> int:
+        model = self.model
+        db = self.session_factory()
+        try:
+            return db.query(model.generation).filter(model.name == self.name).scalar() or 0
+        finally:
+            db.close()
+
+    def advance(self) -> int:
+        """Podbij generację (tylko lider) - sygnał dla pozostałych workerów"""
+        model = self.model
+        db = self.session_factory()
+        try:
+            db.query(model).filter(model.name == self.name, model.holder == self.holder).update(
+                {model.generation: model.generation + 1}, synchronize_session=False
+            )
+            db.commit()
+            return db.query(model.generation).filter(model.name == self.name).scalar() or 0
+        finally:
+            db.close()
+
+
+class PeriodicJob:
+    """
+    Pętla zadania okresowego. `job` (synchroniczne, w puli wątków) zwraca
+    liczbę zmienionych rekordów; `on_remote_change` jest wołane na workerach,
+    które zobaczyły zmiany zrobione przez lidera.
+    """
+
+    def __init__(self, lease: LeaderLease, job: Callable[[], int], interval: float = SCHEDULER_INTERVAL, on_remote_change: Optional[Callable[[], None]] = None):
+        self.lease = lease
+        self.job = job
+        self.interval = interval
+        self.on_remote_change = on_remote_change
+        self._seen_generation: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def tick(self) -> int:
+        """Jeden przebieg: zadanie, jeśli jesteśmy liderem, i synchronizacja generacji"""
+        changed = 0
+        if self.lease.acquire():
+            changed = self.job()
+            if changed:
+                self._seen_generation = self.lease.advance()
+        generation = self.lease.generation()
+        if self._seen_generation is not None and generation != self._seen_generation and self.on_remote_change:
+            self.on_remote_change()
+        self._seen_generation = generation
+        return changed
+
+    async def _run(self):
+        while True:
+            try:
+                await anyio.to_thread.run_sync(self.tick)
+            except OperationalError as error:
+                # Baza zajęta / niedostępna - spróbujemy w następnym przebiegu
+                logger.warning("Przebieg zadania %s nieudany: %s", self.lease.name, error)
+            except Exception:
+                logger.exception("Błąd zadania %s", self.lease.name)
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await anyio.to_thread.run_sync(self.lease.release)
@@ -0,0 +1,150 @@
+# backend/search.py
+"""
+Wyszukiwanie pełnotekstowe sprzętu.
+
+Na SQLite z FTS5 - tabela wirtualna `equipment_fts` (rowid = id sprzętu)
+z rankingiem bm25. Na innych bazach (albo SQLite bez FTS5) - zwykła tabela
+`equipment_search` z dokumentem i dopasowaniem LIKE po tokenach.
+W obu przypadkach tekst jest normalizowany (małe litery, bez polskich
+znaków), więc "zuraw lodz" znajdzie "Żuraw ... łódź".
+"""
+from typing import Any, Dict, Iterable, List, Mapping, Tuple
+import json
+import re
+import unicodedata
+
+from sqlalchemy import Float, Integer, and_, case, column, literal, select, table, text
+
+# Ł/ł nie rozkłada się w NFKD na literę + znak diakrytyczny
+_FOLD = str.maketrans({"ł": "l", "Ł": "L"})
+_TOKEN = re.compile(r"\w+")
+
+MAX_QUERY_TOKENS = 10
+
+# Kolumny indeksu i ich wagi w bm25
+FTS_COLUMNS = ("name", "category", "description", "features", "attributes")
+FTS_WEIGHTS = (10.0, 4.0, 2.0, 3.0, 1.0)
+
+# Pola sprzętu potrzebne do zbudowania dokumentu
+SOURCE_FIELDS = ("name", "category", "description", "features", "specifications", "weight", "fuel_type", "power", "reach")
+
+
+def remove_diacritics(value: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", value.translate(_FOLD))
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def normalize(value: Any) -> str:
+    return remove_diacritics(str(value or "")).lower()
+
+
+def query_tokens(query: str) -> List[str]:
+    return _TOKEN.findall(normalize(query))[:MAX_QUERY_TOKENS]
+
+
+def _json_values(raw: Any) -> List[str]:
+    """Wartości z listy/obiektu zapisanego jako JSON (cechy, specyfikacja)"""
+    try:
+        data = json.loads(raw) if isinstance(raw, str) else raw
+    except ValueError:
+        return [str(raw)]
+    if isinstance(data, dict):
+        return [f"{key} {value}" for key, value in data.items()]
+    if isinstance(data, list):
+        return [str(item) for item in data]
+    return [] if data is None else [str(data)]
+
+
+def document(fields: Mapping[str, Any]) -> Dict[str, str]:
+    """Znormalizowane kolumny indeksu z pól sprzętu"""
+    attributes = _json_values(fields.get("specifications")) + [
+        str(fields.get(name) or "") for name in ("weight", "fuel_type", "power", "reach")
+    ]
+    return {
+        "name": normalize(fields.get("name")),
+        "category": normalize(fields.get("category")),
+        "description": normalize(fields.get("description")),
+        "features": normalize(" ".join(_json_values(fields.get("features")))),
+        "attributes": normalize(" ".join(attributes)),
+    }
+
+
+def fts5_available(engine) -> bool:
+    if engine.dialect.name != "sqlite":
+        return False
+    with engine.connect() as connection:
+        options = [row[0] for row in connection.exec_driver_sql("PRAGMA compile_options")]
+    return "ENABLE_FTS5" in options
+
+
+class EquipmentSearchIndex:
+    """Indeks wyszukiwania synchronizowany jawnie przez ścieżki zapisu sprzętu"""
+
+    def __init__(self, engine):
+        self.use_fts = fts5_available(engine)
+        self._documents = table("equipment_search", column("equipment_id"), column("name"), column("document"))
+
+    def create(self, connection):
+        if self.use_fts:
+            connection.exec_driver_sql(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS equipment_fts USING fts5({', '.join(FTS_COLUMNS)}, tokenize='unicode61')"
+            )
+        else:
+            connection.exec_driver_sql(
+                "CREATE TABLE IF NOT EXISTS equipment_search (equipment_id INTEGER PRIMARY KEY, name TEXT, document TEXT)"
+            )
+
+    def count(self, db) -> int:
+        name = "equipment_fts" if self.use_fts else "equipment_search"
+        return db.execute(text(f"SELECT count(*) FROM {name}")).scalar()
+
+    def remove(self, db, equipment_ids: Iterable[int]):
+        ids = list(equipment_ids)
+        if not ids:
+            return
+        if self.use_fts:
+            db.execute(text("DELETE FROM equipment_fts WHERE rowid = :id"), [{"id": equipment_id} for equipment_id in ids])
+        else:
+            db.execute(self._documents.delete().where(self._documents.c.equipment_id.in_(ids)))
+
+    def sync(self, db, items: Iterable[Tuple[int, Mapping[str, Any]]]):
+        """(Prze)indeksuj sprzęt: pary (id, pola) - w transakcji zapisu"""
+        rows = [(equipment_id, document(fields)) for equipment_id, fields in items]
+        if not rows:
+            return
+        self.remove(db, [equipment_id for equipment_id, _ in rows])
+        if self.use_fts:
+            db.execute(
+                text(f"INSERT INTO equipment_fts (rowid, {', '.join(FTS_COLUMNS)}) VALUES (:id, {', '.join(':' + name for name in FTS_COLUMNS)})"),
+                [{"id": equipment_id, **columns} for equipment_id, columns in rows],
+            )
+        else:
+            db.execute(self._documents.insert(), [
+                {"equipment_id": equipment_id, "name": columns["name"], "document": " ".join(columns.values())}
+                for equipment_id, columns in rows
+            ])
+
+    def clear(self, db):
+        db.execute(text("DELETE FROM equipment_fts" if self.use_fts else "DELETE FROM equipment_search"))
+
+    def matches(self, tokens: List[str]):
+        """Podzapytanie (equipment_id, rank) - niższy rank = lepsze dopasowanie"""
+        if self.use_fts:
+            # Każdy token jako prefiks, wszystkie wymagane
+            expression = " ".join(f'"{token}"*' for token in tokens)
+            weights = ", ".join(str(weight) for weight in FTS_WEIGHTS)
+            return text(
+                f"SELECT rowid AS equipment_id, bm25(equipment_fts, {weights}) AS rank "
+                "FROM equipment_fts WHERE equipment_fts MATCH :expression"
+            ).bindparams(expression=expression).columns(
+                column("equipment_id", Integer), column("rank", Float)
+            ).subquery("matches")
+
+        documents = self._documents
+        in_name = and_(*[documents.c.name.contains(token, autoescape=True) for token in tokens])
+        return select(
+            documents.c.equipment_id.label("equipment_id"),
+            case((in_name, literal(-1.0)), else_=literal(0.0)).label("rank"),
+        ).where(
+            and_(*[documents.c.document.contains(token, autoescape=True) for token in tokens])
+        ).subquery("matches")
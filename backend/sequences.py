@@ -0,0 +1,66 @@
+# backend/sequences.py
+from typing import Dict, Tuple
+import os
+import threading
+
+from sqlalchemy.exc import IntegrityError
+
+# Ile numerów worker rezerwuje w bazie za jednym razem
+SEQUENCE_BLOCK_SIZE = int(os.getenv("SEQUENCE_BLOCK_SIZE", "50"))
+
+
+class BlockSequenceAllocator:
+    """
+    Sekwencje numerów w tabeli bazy, wydawane workerom blokami.
+
+    Wiersz sekwencji jest aktualizowany raz na `block_size` numerów (w osobnej,
+    krótkiej transakcji), a kolejne numery z bloku wydajemy z pamięci procesu.
+    Numery są unikalne i rosnące w obrębie workera; po restarcie niewykorzystana
+    końcówka bloku zostaje pominięta (dziury w numeracji są dopuszczalne).
+    """
+
+    def __init__(self, session_factory, model, block_size: int = SEQUENCE_BLOCK_SIZE):
+        self.session_factory = session_factory
+        self.model = model  # kolumny: name (PK), next_value
+        self.block_size = block_size
+        self._blocks: Dict[str, Tuple[int, int]] = {}  # nazwa -> (następny, koniec bloku)
+        self._lock = threading.Lock()
+
+    def next_value(self, name: str) -> int:
+        with self._lock:
+            current, end = self._blocks.get(name, (0, 0))
+            if current >= end:
+                current, end = self._reserve_block(name)
+            self._blocks[name] = (current + 1, end)
+            return current
+
+    def reset(self, name: str = None):
+        """Zapomnij lokalne bloki (np. po ręcznym przestawieniu sekwencji)"""
+        with self._lock:
+            if name is None:
+                self._blocks.clear()
+            else:
+                self._blocks.pop(name, None)
+
+    def _reserve_block(self, name: str) -> Tuple[int, int]:
+        model = self.model
+        while True:
+            db = self.session_factory()
+            try:
+                # UPDATE najpierw - blokuje wiersz do końca transakcji, więc
+                # odczyt poniżej widzi już naszą wartość
+                updated = db.query(model).filter(model.name == name).update(
+                    {model.next_value: model.next_value + self.block_size}, synchronize_session=False
+                )
+                if updated:
+                    end = db.query(model.next_value).filter(model.name == name).scalar()
+                else:
+                    end = 1 + self.block_size
+                    db.add(model(name=name, next_value=end))
+                db.commit()
+                return end - self.block_size, end
+            except IntegrityError:
+                # Inny worker utworzył wiersz równolegle - spróbuj ponownie UPDATE
+                db.rollback()
+            finally:
+                db.close()
@@ -0,0 +1,15 @@
+# backend/tests/conftest.py
+import os
+import sys
+import tempfile
+
+# main.py czyta konfigurację przy imporcie - świeża baza w katalogu
+# tymczasowym, bez schedulera i bez limitu requestów
+TEST_DIR = tempfile.mkdtemp(prefix="spellbudex-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(TEST_DIR, 'spellbudex.db')}")
+os.environ.setdefault("SCHEDULER_ENABLED", "0")
+os.environ.setdefault("RATE_LIMIT_CALLS", "1000000")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,27 @@
+# backend/tests/test_gateway.py
+"""Polityka autoryzacji w middleware (tabela tras w middleware.py)"""
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+def test_unknown_api_path_is_not_found_for_anonymous_client(client):
+    assert client.get("/api/does-not-exist").status_code == 404
+    assert client.post("/api/reservations/1/unknown").status_code == 404
+
+
+def test_existing_protected_route_requires_token(client):
+    response = client.get("/api/reservations")
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Brak tokenu autoryzacji lub token nieprawidłowy"
+
+
+def test_public_route_is_open(client):
+    assert client.get("/api/equipment").status_code == 200
@@ -0,0 +1,82 @@
+# backend/tests/test_reservation_queries.py
+"""Lista rezerwacji nie może robić zapytań per wiersz (N+1)"""
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+import main
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as test_client:
+        test_client.post("/api/seed-data")
+        yield test_client
+
+
+@pytest.fixture(scope="module")
+def auth_headers(client):
+    response = client.post("/api/auth/login", json={"email": "admin@spellbudex.pl", "password": "admin123"})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def create_reservations(client, headers, count):
+    """Każda rezerwacja na osobnej maszynie - rezerwacja zmienia status sprzętu na rented"""
+    start = date.today() + timedelta(days=7)
+    for number in range(count):
+        equipment = client.post("/api/equipment", json={
+            "name": f"Koparka testowa {number}",
+            "category": "Maszyny ziemne",
+            "daily_rate": 500.0,
+            "description": "Sprzęt testowy",
+            "weight": "20 ton",
+            "fuel_type": "Diesel",
+            "power": "129 kW",
+            "reach": "9.5m",
+            "features": [],
+            "specifications": {},
+        }, headers=headers)
+        equipment.raise_for_status()
+        reservation = client.post("/api/reservations", json={
+            "equipment_id": equipment.json()["id"],
+            "start_date": start.isoformat(),
+            "end_date": (start + timedelta(days=2)).isoformat(),
+        }, headers=headers)
+        reservation.raise_for_status()
+
+
+@contextmanager
+def count_statements():
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(main.engine, "before_cursor_execute", on_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(main.engine, "before_cursor_execute", on_execute)
+
+
+def list_reservations(client, headers):
+    with count_statements() as statements:
+        response = client.get("/api/reservations", headers=headers)
+    response.raise_for_status()
+    return response.json(), len(statements)
+
+
+def test_reservation_list_query_count_does_not_grow_with_rows(client, auth_headers):
+    create_reservations(client, auth_headers, 1)
+    single, single_count = list_reservations(client, auth_headers)
+
+    create_reservations(client, auth_headers, 9)
+    many, many_count = list_reservations(client, auth_headers)
+
+    assert len(many) == len(single) + 9
+    assert all(reservation["equipment"] and reservation["customer"] for reservation in many)
+    assert many_count == single_count
@@ -0,0 +1,49 @@
+# backend/units.py
+"""
+Parsowanie tekstowych parametrów sprzętu ("20 ton", "129 kW", "9.5m")
+do liczb w jednostkach bazowych: kg, kW, m. Wartości bez jednostki,
+z nieznaną jednostką albo "na jednostkę" (np. "25kg/m²") dają None.
+"""
+from typing import Dict, Optional
+import re
+
+# Liczba (także "1,5" i "20 500") + jednostka + reszta bezpośrednio po niej
+_QUANTITY = re.compile(r"(\d{1,3}(?:[ \u00a0]\d{3})+|\d+)(?:[.,](\d+))?\s*([^\W\d_]*)(\S*)")
+
+WEIGHT_UNITS: Dict[str, float] = {
+    "kg": 1.0, "g": 0.001,
+    "t": 1000.0, "ton": 1000.0, "tona": 1000.0, "tony": 1000.0, "tonn": 1000.0, "tonne": 1000.0,
+}
+POWER_UNITS: Dict[str, float] = {
+    "kw": 1.0, "w": 0.001, "mw": 1000.0,
+    "km": 0.7355, "ps": 0.7355, "hp": 0.7457,  # KM - konie mechaniczne
+}
+LENGTH_UNITS: Dict[str, float] = {"m": 1.0, "cm": 0.01, "mm": 0.001}
+
+
+def parse_quantity(value: Optional[str], units: Dict[str, float]) -> Optional[float]:
+    if not value:
+        return None
+    match = _QUANTITY.search(str(value))
+    if not match:
+        return None
+    whole, fraction, unit, rest = match.groups()
+    if rest[:1] in ("/", "²", "³", "^"):
+        return None
+    factor = units.get(unit.lower())
+    if factor is None:
+        return None
+    number = float(whole.replace(" ", "").replace(" ", "") + ("." + fraction if fraction else ""))
+    return round(number * factor, 3)
+
+
+def parse_weight_kg(value: Optional[str]) -> Optional[float]:
+    return parse_quantity(value, WEIGHT_UNITS)
+
+
+def parse_power_kw(value: Optional[str]) -> Optional[float]:
+    return parse_quantity(value, POWER_UNITS)
+
+
+def parse_length_m(value: Optional[str]) -> Optional[float]:
+    return parse_quantity(value, LENGTH_UNITS)
@@ -3,6 +3,7 @@
 import { useState, useEffect } from 'react'
 import { useRouter } from 'next/navigation'
 import axios from 'axios'
+import { fetchAllPages } from '@/lib/pagination'
 
 const API_BASE_URL = 'http://localhost:8000'
 
@@ -66,21 +67,23 @@ export default function DashboardPage() {
     try {
       setLoading(true)
       
-      const [statsRes, equipmentRes, reservationsRes] = await Promise.all([
+      // Listy są stronicowane - pobierz wszystkie strony, rezerwacje od najnowszych
+      const [statsRes, equipmentList, reservationList] = await Promise.all([
         axios.get(`${API_BASE_URL}/api/statistics`, {
           headers: { Authorization: `Bearer ${token}` }
         }),
-        axios.get(`${API_BASE_URL}/api/equipment`, {
+        fetchAllPages(`${API_BASE_URL}/api/equipment`, {
           headers: { Authorization: `Bearer ${token}` }
         }),
-        axios.get(`${API_BASE_URL}/api/reservations`, {
-          headers: { Authorization: `Bearer ${token}` }
+        fetchAllPages(`${API_BASE_URL}/api/reservations`, {
+          headers: { Authorization: `Bearer ${token}` },
+          params: { order: 'desc' }
         })
       ])
 
       setStats(statsRes.data)
-      setEquipment(equipmentRes.data)
-      setReservations(reservationsRes.data)
+      setEquipment(equipmentList)
+      setReservations(reservationList)
 
     } catch (error) {
       console.error('Błąd:', error)
@@ -11,6 +11,7 @@ import {
 import Link from "next/link"
 import Image from "next/image"
 import axios from "axios"
+import { fetchAllPages } from "@/lib/pagination"
 
 export default function FleetPage() {
   // Categories for filtering - zmienione na sprzęt budowlany
@@ -30,8 +31,9 @@ export default function FleetPage() {
     try {
       setLoading(true);
       // Wywołanie do backend API
-      const response = await axios.get('http://localhost:8000/api/equipment');
-      setEquipment(response.data);
+      // Lista jest stronicowana - pobierz wszystkie strony
+      const equipmentList = await fetchAllPages('http://localhost:8000/api/equipment');
+      setEquipment(equipmentList);
     } catch (error) {
       console.error('Błąd podczas pobierania sprzętu:', error);
       // Fallback na przykładowe dane jeśli API nie działa
@@ -46,7 +46,7 @@ export default function LandingPage() {
       setLoading(true);
       
       // Pobierz dostępny sprzęt (pierwszych 6 dla featured)
-      const equipmentResponse = await axios.get(`${API_BASE_URL}/api/equipment?available_only=true`);
+      const equipmentResponse = await axios.get(`${API_BASE_URL}/api/equipment?available_only=true&limit=6`);
       setFeaturedEquipment(equipmentResponse.data.slice(0, 6));
       
       // Pobierz statystyki jeśli użytkownik jest adminem
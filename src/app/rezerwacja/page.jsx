@@ -11,6 +11,7 @@ import {
 import Link from "next/link"
 import { useSearchParams, useRouter } from 'next/navigation'
 import axios from 'axios'
+import { fetchAllPages } from '@/lib/pagination'
 
 const API_BASE_URL = 'http://localhost:8000';
 
@@ -88,12 +89,15 @@ const fetchUserInfo = async (token) => {
   const fetchEquipment = async () => {
     try {
       setLoading(true);
-      const response = await axios.get(`${API_BASE_URL}/api/equipment?available_only=true`);
-      setEquipment(response.data);
+      // Lista jest stronicowana - pobierz wszystkie strony
+      const equipmentList = await fetchAllPages(`${API_BASE_URL}/api/equipment`, {
+        params: { available_only: true }
+      });
+      setEquipment(equipmentList);
       
       // Jeśli przekazano ID sprzętu w URL, ustaw go jako wybrany
       if (equipmentId) {
-        const selected = response.data.find(item => item.id === parseInt(equipmentId));
+        const selected = equipmentList.find(item => item.id === parseInt(equipmentId));
         if (selected) {
           setSelectedEquipment(selected);
           setCurrentStep(2);
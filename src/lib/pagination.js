@@ -0,0 +1,24 @@
+// lib/pagination.js
+import axios from 'axios'
+
+// Największa strona akceptowana przez API (PAGE_SIZE_MAX)
+const PAGE_SIZE = 1000
+
+// Pobierz wszystkie strony listy - API zwraca kursor następnej strony
+// w nagłówku X-Next-Cursor (brak nagłówka = ostatnia strona)
+export async function fetchAllPages(url, config = {}) {
+  const items = []
+  let cursor = null
+
+  do {
+    const params = { ...config.params, limit: PAGE_SIZE }
+    if (cursor) {
+      params.cursor = cursor
+    }
+    const response = await axios.get(url, { ...config, params })
+    items.push(...response.data)
+    cursor = response.headers['x-next-cursor']
+  } while (cursor)
+
+  return items
+}